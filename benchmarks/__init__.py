@@ -1,18 +1,28 @@
 #!/usr/bin/env python3
-"""Long-context window benchmarking suite."""
+"""Long-context window benchmarking suite.
 
-from benchmarks.base_benchmark import BaseBenchmark
-from benchmarks.needle_in_haystack import NeedleInHaystackBenchmark
-from benchmarks.oolong import OOLONGBenchmark
-from benchmarks.oolong_pairs import OOLONGPairsBenchmark
-from benchmarks.codeqa import CodeQABenchmark
-from benchmarks.browsecomp import BrowseCompBenchmark
+Benchmark classes are imported lazily (PEP 562), so importing one
+benchmark doesn't load the others.
+"""
+import importlib
 
-__all__ = [
-    'BaseBenchmark',
-    'NeedleInHaystackBenchmark',
-    'OOLONGBenchmark',
-    'OOLONGPairsBenchmark',
-    'CodeQABenchmark',
-    'BrowseCompBenchmark',
-]
+_LAZY_IMPORTS = {
+    'BaseBenchmark': 'benchmarks.base_benchmark',
+    'NeedleInHaystackBenchmark': 'benchmarks.needle_in_haystack',
+    'OOLONGBenchmark': 'benchmarks.oolong',
+    'OOLONGPairsBenchmark': 'benchmarks.oolong_pairs',
+    'CodeQABenchmark': 'benchmarks.codeqa',
+    'BrowseCompBenchmark': 'benchmarks.browsecomp',
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
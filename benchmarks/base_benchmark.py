@@ -1,18 +1,116 @@
 #!/usr/bin/env python3
+import random
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional
-import sys
-import os
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from context_manager import ContextManager
+from functools import lru_cache
+from itertools import accumulate
+from typing import Dict, List, Any, Optional, Tuple, FrozenSet, Sequence
+import numpy as np
+from context_manager import ContextManager, estimate_tokens
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Strings up to this length (filler sentences, questions, snippets) are
+# memoized; generated contexts are unique and counted directly.
+_CACHEABLE_LENGTH = 1000
+
+@lru_cache(maxsize=None)
+def _get_encoding():
+    """Shared cl100k_base encoding, or None if tiktoken can't provide it."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # e.g. the encoding file can't be downloaded
+        return None
+
+def _encode_count(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def _encode_counts(texts: List[str]) -> List[int]:
+    encoding = _get_encoding()
+    if encoding is None:
+        return [estimate_tokens(text) for text in texts]
+    return [len(tokens) for tokens in encoding.encode_batch(texts, disallowed_special=())]
+
+@lru_cache(maxsize=4096)
+def _cached_count(text: str) -> int:
+    return _encode_count(text)
+
+class FillerCorpus:
+    """Random filler text sliced out of one long prejoined string.
+    
+    `size` sampled sentences are joined once and their start offsets
+    recorded, so a filler run of any length up to `size` is a random
+    sentence-aligned window: one slice instead of sampling and joining.
+    The corpus grows if a longer run is requested, and is resampled every
+    `refresh_every` uses to keep contexts varied.
+    """
+    
+    def __init__(self, sentences: Sequence[str], rng: Optional[np.random.Generator] = None,
+                 size: int = 10_000, refresh_every: int = 32):
+        self.sentences = tuple(sentences)
+        self.refresh_every = refresh_every
+        self._rng = rng if rng is not None else np.random.default_rng()
+        self._sentence_array = np.array(self.sentences, dtype=object)
+        self._uses = 0
+        self._build(size)
+    
+    def _build(self, size: int):
+        sampled = self._sentence_array[self._rng.integers(0, len(self.sentences), size=size)].tolist()
+        self._size = size
+        self._text = " ".join(sampled)
+        # _offsets[k] is where sentence k starts; the last entry is one past
+        # the end, as if the text had a trailing space
+        self._offsets = [0, *accumulate(len(sentence) + 1 for sentence in sampled)]
+    
+    def weave(self, count: int, inserts: Sequence[Tuple[int, str]] = ()) -> str:
+        """`count` random filler sentences with extra sentences spliced in.
+        
+        Args:
+            count: Number of filler sentences
+            inserts: (position, sentence) pairs in ascending position order;
+                each sentence is placed after `position` filler sentences
+        """
+        self._uses += 1
+        if count > self._size:
+            self._build(2 * count)
+        elif self._uses % self.refresh_every == 0:
+            self._build(self._size)
+        
+        text, offsets = self._text, self._offsets
+        first = int(self._rng.integers(0, self._size - count + 1))
+        parts = []
+        cursor = first
+        for position, sentence in inserts:
+            stop = first + position
+            if stop > cursor:
+                parts.append(text[offsets[cursor]:offsets[stop] - 1])
+            parts.append(sentence)
+            cursor = stop
+        if first + count > cursor:
+            parts.append(text[offsets[cursor]:offsets[first + count] - 1])
+        return " ".join(parts)
 
 class BaseBenchmark(ABC):
     """Base class for all long-context benchmarks."""
     
-    def __init__(self, name: str, description: str):
+    def __init__(self, name: str, description: str, seed: Optional[int] = None):
         self.name = name
         self.description = description
-        self.context_manager = ContextManager()
+        self.context_manager = ContextManager(token_counter=self.count_tokens)
+        # expected_id -> (normalized answer, answer words, key terms)
+        self._expected_cache: Dict[str, Tuple[str, FrozenSet[str], List[str]]] = {}
+        # Per-instance generators (stdlib for choices, numpy for bulk draws),
+        # seeded together so a run can be replayed
+        self._random = random.Random(seed)
+        self._rng = np.random.default_rng(seed)
     
     @abstractmethod
     def generate_test_case(self, context_length: int, **kwargs) -> Dict[str, Any]:
@@ -32,6 +130,57 @@ class BaseBenchmark(ABC):
         """
         pass
     
+    def sample(self, pool: Sequence[str], k: int) -> List[str]:
+        """Draw k items from pool (with replacement) using one vectorized RNG call."""
+        return [pool[i] for i in self._rng.integers(0, len(pool), size=k).tolist()]
+    
+    def pool_token_counts(self, pool: Sequence[str]) -> np.ndarray:
+        """Token count of every pool entry, encoded as one batch."""
+        return np.array(_encode_counts(list(pool)), dtype=np.int64)
+    
+    def sample_to_budget(self, pool: Sequence[str], pool_tokens: np.ndarray,
+                         budget: int, min_count: int = 1) -> List[str]:
+        """Sample pool entries (with replacement) until their token counts reach budget.
+        
+        Draws enough indices to cover the budget with the shortest entry, then
+        cuts the running token sum with a binary search.
+        """
+        upper = max(min_count, -(-budget // max(1, int(pool_tokens.min()))))
+        idx = self._rng.integers(0, len(pool), size=upper)
+        cumulative = np.cumsum(pool_tokens[idx])
+        count = max(min_count, int(np.searchsorted(cumulative, budget)) + 1)
+        return [pool[i] for i in idx[:count].tolist()]
+    
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Case-folded, stripped form used to compare responses with answers."""
+        return text.casefold().strip()
+    
+    @staticmethod
+    def analyze_expected(expected: str) -> Tuple[str, FrozenSet[str], List[str]]:
+        """Split an expected answer into its normalized form, word set and key terms.
+        
+        Key terms are words longer than 4 characters.
+        """
+        expected_lower = BaseBenchmark.normalize(expected)
+        expected_words = frozenset(expected_lower.split())
+        key_terms = [w for w in expected_words if len(w) > 4]
+        return expected_lower, expected_words, key_terms
+    
+    @staticmethod
+    def word_overlap(expected_words: FrozenSet[str], response_lower: str) -> float:
+        """Fraction of expected_words that appear as words in response_lower."""
+        if not expected_words:
+            return 0
+        return len(expected_words.intersection(response_lower.split())) / len(expected_words)
+    
+    def expected_terms(self, expected: str, expected_id: Optional[str] = None) -> Tuple[str, FrozenSet[str], List[str]]:
+        """Precomputed analyze_expected() result for expected_id, computed on the fly if unknown."""
+        cached = self._expected_cache.get(expected_id)
+        if cached is not None:
+            return cached
+        return self.analyze_expected(expected)
+    
     def get_context_messages(self) -> List[Dict[str, str]]:
         """Get context in OpenAI message format."""
         return self.context_manager.get_messages()
@@ -40,14 +189,24 @@ class BaseBenchmark(ABC):
         """Clear the context manager."""
         self.context_manager.clear()
     
+    def set_context(self, content: str, role: str = "user"):
+        """Make content the only context entry, reusing the existing entry if there is one."""
+        if self.context_manager.size() == 1:
+            self.context_manager.update(0, role=role, content=content)
+        else:
+            self.context_manager.clear()
+            self.context_manager.create(role, content)
+    
     def count_tokens(self, text: str) -> int:
-        """Estimate token count (rough approximation: 1 token ≈ 4 chars)."""
-        return len(text) // 4
+        """Count tokens with tiktoken (cl100k_base).
+        
+        Falls back to the 1 token ≈ 4 chars estimate if tiktoken is unavailable.
+        """
+        if len(text) <= _CACHEABLE_LENGTH:
+            return _cached_count(text)
+        return _encode_count(text)
     
     def get_context_length(self) -> int:
         """Get total context length in tokens."""
-        total = 0
-        for entry in self.context_manager.read():
-            total += self.count_tokens(entry.get("content", ""))
-        return total
+        return self.context_manager.token_count
 
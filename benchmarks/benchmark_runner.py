@@ -1,146 +1,257 @@
 #!/usr/bin/env python3
 """Benchmark runner for long-context evaluation."""
+import asyncio
+import importlib.util
 import json
 import time
-from typing import Dict, List, Any, Optional
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, List, Any, Optional, Callable
+import httpx
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 import os
 
-import sys
-import os
-# Add parent directory to path for imports
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
+import benchmarks
 from benchmarks.base_benchmark import BaseBenchmark
-from benchmarks.needle_in_haystack import NeedleInHaystackBenchmark
-from benchmarks.oolong import OOLONGBenchmark
-from benchmarks.oolong_pairs import OOLONGPairsBenchmark
-from benchmarks.codeqa import CodeQABenchmark
-from benchmarks.browsecomp import BrowseCompBenchmark
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# httpx needs the h2 package for HTTP/2
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
 
 load_dotenv()
 
+# Benchmark name -> zero-arg factory. Classes are resolved through the
+# package's lazy exports, so only the benchmark that runs gets imported.
+BENCHMARK_FACTORIES: Dict[str, Callable[[], BaseBenchmark]] = {
+    "needle_in_haystack": lambda: benchmarks.NeedleInHaystackBenchmark(),
+    "oolong": lambda: benchmarks.OOLONGBenchmark(),
+    "oolong_pairs": lambda: benchmarks.OOLONGPairsBenchmark(),
+    "codeqa": lambda: benchmarks.CodeQABenchmark(),
+    "browsecomp": lambda: benchmarks.BrowseCompBenchmark(),
+}
+
+def _dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize to JSON bytes, using orjson when available."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode()
+
 class BenchmarkRunner:
     """Runs benchmarks and collects results."""
     
-    def __init__(self, model: str = "gpt-4o", api_key: Optional[str] = None):
+    def __init__(self, model: str = "gpt-4o", api_key: Optional[str] = None,
+                 max_concurrency: int = 16, stream_path: Optional[str] = None):
         self.model = model
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OpenAI API key required")
-        self.client = OpenAI(api_key=self.api_key)
-        
-        self.benchmarks = {
-            "needle_in_haystack": NeedleInHaystackBenchmark(),
-            "oolong": OOLONGBenchmark(),
-            "oolong_pairs": OOLONGPairsBenchmark(),
-            "codeqa": CodeQABenchmark(),
-            "browsecomp": BrowseCompBenchmark(),
-        }
+        self.max_concurrency = max_concurrency
+        # One long-lived pool sized for the concurrency level, so TLS
+        # handshakes are amortized across every request of a sweep
+        pool_size = max(64, max_concurrency)
+        self._http_client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(600.0, connect=10.0)
+        )
+        self.async_client = AsyncOpenAI(api_key=self.api_key, http_client=self._http_client)
+        # If set, every run result is appended to this file as a JSON line
+        self.stream_path = stream_path
+        self._loop = asyncio.new_event_loop()
+        # Test-case generation mutates the benchmark's context manager, so a
+        # single worker serializes it while keeping it off the event loop.
+        self._generation_executor = ThreadPoolExecutor(max_workers=1)
+        
+        self._factories = dict(BENCHMARK_FACTORIES)
+        self._instances: Dict[str, BaseBenchmark] = {}
+    
+    def get_benchmark(self, benchmark_name: str) -> BaseBenchmark:
+        """Get a benchmark by name, constructing it on first use."""
+        if benchmark_name not in self._instances:
+            if benchmark_name not in self._factories:
+                raise ValueError(f"Unknown benchmark: {benchmark_name}")
+            self._instances[benchmark_name] = self._factories[benchmark_name]()
+        return self._instances[benchmark_name]
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        """Close the HTTP connection pool, worker thread and event loop."""
+        if self._loop.is_closed():
+            return
+        self._loop.run_until_complete(self._http_client.aclose())
+        self._generation_executor.shutdown()
+        self._loop.close()
     
     def run_benchmark(self, benchmark_name: str, context_lengths: List[int], 
                      num_runs: int = 3, **kwargs) -> Dict[str, Any]:
         """Run a benchmark across multiple context lengths.
         
+        Synchronous wrapper around run_benchmark_async; all runs are issued
+        concurrently (bounded by max_concurrency).
+        
         Args:
             benchmark_name: Name of benchmark to run
             context_lengths: List of context lengths (in tokens) to test
             num_runs: Number of runs per context length
             **kwargs: Additional parameters for benchmark generation
         """
-        if benchmark_name not in self.benchmarks:
-            raise ValueError(f"Unknown benchmark: {benchmark_name}")
-        
-        benchmark = self.benchmarks[benchmark_name]
+        return self._run(self.run_benchmark_async(benchmark_name, context_lengths, num_runs, **kwargs))
+    
+    async def run_benchmark_async(self, benchmark_name: str, context_lengths: List[int],
+                                  num_runs: int = 3, **kwargs) -> Dict[str, Any]:
+        """Run a benchmark with every (context length, run) request in flight at once."""
+        benchmark = self.get_benchmark(benchmark_name)
         results = {
             "benchmark": benchmark_name,
             "model": self.model,
             "results": []
         }
         
-        for context_length in context_lengths:
-            print(f"\nRunning {benchmark_name} at {context_length} tokens...")
-            
+        print(f"\nRunning {benchmark_name} at {', '.join(str(l) for l in context_lengths)} tokens "
+              f"({len(context_lengths) * num_runs} runs, up to {self.max_concurrency} concurrent)...")
+        
+        sem = asyncio.Semaphore(self.max_concurrency)
+        # Local to this call, so concurrent sweeps each own (and close) their handle
+        out_fp = open(self.stream_path, 'ab') if self.stream_path else None
+        try:
+            run_results = await asyncio.gather(*(
+                self._one_run(benchmark_name, benchmark, context_length, run, num_runs, sem, out_fp, **kwargs)
+                for context_length in context_lengths
+                for run in range(num_runs)
+            ))
+        finally:
+            if out_fp is not None:
+                out_fp.close()
+        
+        for i, context_length in enumerate(context_lengths):
             length_results = {
                 "context_length": context_length,
-                "runs": []
+                "runs": run_results[i * num_runs:(i + 1) * num_runs]
             }
             
-            for run in range(num_runs):
-                print(f"  Run {run + 1}/{num_runs}...", end=" ", flush=True)
-                
-                # Generate test case
-                test_case = benchmark.generate_test_case(context_length, **kwargs)
-                
-                # Get messages
-                messages = benchmark.get_context_messages()
-                messages.append({
-                    "role": "user",
-                    "content": test_case["question"]
-                })
-                
-                # Call model
-                start_time = time.time()
-                try:
-                    response = self.client.chat.completions.create(
-                        model=self.model,
-                        messages=messages
-                    )
-                    model_response = response.choices[0].message.content
-                    success = True
-                    error = None
-                except Exception as e:
-                    model_response = ""
-                    success = False
-                    error = str(e)
-                
-                elapsed_time = time.time() - start_time
-                
-                # Evaluate
-                if success:
-                    evaluation = benchmark.evaluate(
-                        model_response,
-                        test_case["expected_answer"],
-                        **kwargs
-                    )
-                else:
-                    evaluation = {
-                        "correct": False,
-                        "score": 0.0,
-                        "error": error
-                    }
-                
-                run_result = {
-                    "run": run + 1,
-                    "test_case": {
-                        "question": test_case["question"],
-                        "expected_answer": test_case["expected_answer"],
-                        "metadata": test_case.get("metadata", {})
-                    },
-                    "response": model_response,
-                    "evaluation": evaluation,
-                    "latency": elapsed_time,
-                    "success": success
-                }
-                
-                length_results["runs"].append(run_result)
-                print(f"Score: {evaluation['score']:.2f}")
-            
-            # Calculate averages
-            scores = [r["evaluation"]["score"] for r in length_results["runs"] if r["success"]]
-            latencies = [r["latency"] for r in length_results["runs"] if r["success"]]
+            # Calculate averages in a single pass over the runs
+            num_success = 0
+            score_sum = 0.0
+            latency_sum = 0.0
+            for r in length_results["runs"]:
+                if r["success"]:
+                    num_success += 1
+                    score_sum += r["evaluation"]["score"]
+                    latency_sum += r["latency"]
             
             length_results["summary"] = {
-                "avg_score": sum(scores) / len(scores) if scores else 0.0,
-                "avg_latency": sum(latencies) / len(latencies) if latencies else 0.0,
-                "success_rate": sum(1 for r in length_results["runs"] if r["success"]) / num_runs
+                "avg_score": score_sum / num_success if num_success else 0.0,
+                "avg_latency": latency_sum / num_success if num_success else 0.0,
+                "success_rate": num_success / num_runs
             }
             
             results["results"].append(length_results)
         
         return results
     
+    async def _one_run(self, benchmark_name: str, benchmark: BaseBenchmark, context_length: int, run: int,
+                       num_runs: int, sem: asyncio.Semaphore, out_fp: Optional[BinaryIO] = None,
+                       **kwargs) -> Dict[str, Any]:
+        """Generate, send and evaluate a single test case.
+        
+        If out_fp is given, the result is appended to it as a JSON line.
+        """
+        async with sem:
+            # Generate the test case in the worker thread while other runs'
+            # requests are in flight
+            test_case, messages = await asyncio.get_running_loop().run_in_executor(
+                self._generation_executor,
+                lambda: self._generate(benchmark, context_length, **kwargs)
+            )
+            
+            # Call model
+            start_time = time.perf_counter()
+            try:
+                response = await self.async_client.chat.completions.create(
+                    model=self.model,
+                    messages=messages
+                )
+                model_response = response.choices[0].message.content
+                success = True
+                error = None
+            except Exception as e:
+                model_response = ""
+                success = False
+                error = str(e)
+            
+            elapsed_time = time.perf_counter() - start_time
+        
+        # Evaluate
+        if success:
+            evaluation = benchmark.evaluate(
+                model_response,
+                test_case["expected_answer"],
+                expected_id=test_case.get("metadata", {}).get("expected_id"),
+                **kwargs
+            )
+        else:
+            evaluation = {
+                "correct": False,
+                "score": 0.0,
+                "error": error
+            }
+        
+        print(f"  {context_length} tokens, run {run + 1}/{num_runs}: Score: {evaluation['score']:.2f}")
+        
+        run_result = {
+            "run": run + 1,
+            "test_case": {
+                "question": test_case["question"],
+                "expected_answer": test_case["expected_answer"],
+                "metadata": test_case.get("metadata", {})
+            },
+            "response": model_response,
+            "evaluation": evaluation,
+            "latency": elapsed_time,
+            "success": success
+        }
+        
+        if out_fp is not None:
+            out_fp.write(_dumps({
+                "benchmark": benchmark_name,
+                "context_length": context_length,
+                **run_result
+            }) + b"\n")
+            # Written as each run completes, not when the sweep ends
+            out_fp.flush()
+        return run_result
+    
+    @staticmethod
+    def _generate(benchmark: BaseBenchmark, context_length: int, **kwargs):
+        """Generate a test case and the messages to send for it."""
+        test_case = benchmark.generate_test_case(context_length, **kwargs)
+        
+        # Get messages
+        messages = benchmark.get_context_messages()
+        messages.append({
+            "role": "user",
+            "content": test_case["question"]
+        })
+        return test_case, messages
+    
+    def _run(self, coro):
+        """Run a coroutine on the runner's event loop.
+        
+        A single long-lived loop is reused so the async client's connection
+        pool stays valid across calls.
+        """
+        return self._loop.run_until_complete(coro)
+    
     def run_all_benchmarks(self, context_lengths: List[int], num_runs: int = 3) -> Dict[str, Any]:
         """Run all benchmarks."""
         all_results = {
@@ -148,7 +259,7 @@ class BenchmarkRunner:
             "benchmarks": {}
         }
         
-        for benchmark_name in self.benchmarks.keys():
+        for benchmark_name in self._factories.keys():
             print(f"\n{'='*60}")
             print(f"Running {benchmark_name} benchmark")
             print(f"{'='*60}")
@@ -164,8 +275,8 @@ class BenchmarkRunner:
     
     def save_results(self, results: Dict[str, Any], filepath: str):
         """Save results to JSON file."""
-        with open(filepath, 'w') as f:
-            json.dump(results, f, indent=2)
+        with open(filepath, 'wb') as f:
+            f.write(_dumps(results, indent=True))
         print(f"\nResults saved to {filepath}")
     
     def print_summary(self, results: Dict[str, Any]):
@@ -204,8 +315,7 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description="Run long-context benchmarks")
-    parser.add_argument("--benchmark", choices=["all", "needle_in_haystack", "oolong", 
-                                                "oolong_pairs", "codeqa", "browsecomp"],
+    parser.add_argument("--benchmark", choices=["all", *BENCHMARK_FACTORIES],
                        default="all", help="Benchmark to run")
     parser.add_argument("--context-lengths", type=int, nargs="+",
                        default=[1000, 5000, 10000, 20000],
@@ -214,21 +324,24 @@ def main():
                        help="Number of runs per context length")
     parser.add_argument("--model", default="gpt-4o",
                        help="Model to use")
+    parser.add_argument("--concurrency", type=int, default=16,
+                       help="Maximum number of concurrent API requests")
     parser.add_argument("--output", help="Output file for results (JSON)")
+    parser.add_argument("--stream", help="Append each run result to this file as it completes (JSON lines)")
     
     args = parser.parse_args()
     
-    runner = BenchmarkRunner(model=args.model)
-    
-    if args.benchmark == "all":
-        results = runner.run_all_benchmarks(args.context_lengths, args.runs)
-    else:
-        results = runner.run_benchmark(args.benchmark, args.context_lengths, args.runs)
-    
-    runner.print_summary(results)
-    
-    if args.output:
-        runner.save_results(results, args.output)
+    with BenchmarkRunner(model=args.model, max_concurrency=args.concurrency,
+                         stream_path=args.stream) as runner:
+        if args.benchmark == "all":
+            results = runner.run_all_benchmarks(args.context_lengths, args.runs)
+        else:
+            results = runner.run_benchmark(args.benchmark, args.context_lengths, args.runs)
+        
+        runner.print_summary(results)
+        
+        if args.output:
+            runner.save_results(results, args.output)
 
 if __name__ == "__main__":
     main()
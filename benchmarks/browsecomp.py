@@ -1,15 +1,15 @@
 #!/usr/bin/env python3
-import random
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from benchmarks.base_benchmark import BaseBenchmark
 
 class BrowseCompBenchmark(BaseBenchmark):
     """BrowseComp+: Tests ability to browse and comprehend long documents."""
     
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
         super().__init__(
             name="BrowseComp+",
-            description="Tests ability to browse and comprehend information across long documents"
+            description="Tests ability to browse and comprehend information across long documents",
+            seed=seed
         )
         self.document_sections = [
             {
@@ -44,88 +44,101 @@ class BrowseCompBenchmark(BaseBenchmark):
             ("What do the results indicate?", "significant progress"),
             ("What are the implications?", "future research"),
         ]
+        # Detail sentences added to each section
+        self.detail_sentences = (
+            "Additional details are provided in this section.",
+            "More information follows in the subsequent paragraphs.",
+            "Further explanations clarify the concepts discussed.",
+            "The section continues with relevant information.",
+            "Additional context is included for completeness.",
+        )
+        # Parallel arrays over document_sections, lowercased once
+        self._titles = [section["title"] for section in self.document_sections]
+        self._titles_lower = [title.lower() for title in self._titles]
+        self._contents = [section["content"] for section in self.document_sections]
+        self._contents_lower = [content.lower() for content in self._contents]
+        # expected_part -> index of the section whose content contains it
+        self._answer_index = {}
+        for _, expected_part in self.questions:
+            part_lower = expected_part.lower()
+            section_index = next((i for i, c in enumerate(self._contents_lower) if part_lower in c), None)
+            if section_index is not None:
+                self._answer_index[expected_part] = section_index
+        for title, content in zip(self._titles, self._contents):
+            self._expected_cache[title] = self.analyze_expected(content)
     
     def generate_test_case(self, context_length: int, num_sections: int = None, **kwargs) -> Dict[str, Any]:
         """Generate a BrowseComp+ test case."""
         # Determine number of sections
         if num_sections is None:
             # Estimate: each section is ~30 tokens, target context length
-            num_sections = max(3, min(len(self.document_sections), context_length // 30))
+            num_sections = max(3, min(len(self._titles), context_length // 30))
         
         # Select sections
-        selected_sections = random.sample(self.document_sections, min(num_sections, len(self.document_sections)))
+        selected_indices = self._random.sample(range(len(self._titles)), min(num_sections, len(self._titles)))
         
-        # Add detail sentences to each section
-        detail_sentences = [
-            "Additional details are provided in this section.",
-            "More information follows in the subsequent paragraphs.",
-            "Further explanations clarify the concepts discussed.",
-            "The section continues with relevant information.",
-            "Additional context is included for completeness.",
-        ]
+        # Draw the detail sentences for every section at once
+        details = self.sample(self.detail_sentences, 3 * len(selected_indices))
         
         # Build document
         document_parts = []
         key_facts = {}
         
-        for i, section in enumerate(selected_sections):
-            # Add section with details
-            section_text = f"{section['title']}\n{section['content']}"
-            
+        for i, section_index in enumerate(selected_indices):
             # Add a unique fact to each section for questions
             fact_key = f"fact_{i}"
-            fact_value = f"Section {i+1} contains important information about {section['title'].lower()}."
+            fact_value = f"Section {i+1} contains important information about {self._titles_lower[section_index]}."
             key_facts[fact_key] = fact_value
-            section_text += f" {fact_value}"
-            
-            # Add filler
-            section_text += " " + " ".join(random.choices(detail_sentences, k=3))
             
-            document_parts.append(section_text)
+            # Section title, content, fact and filler joined in one pass
+            document_parts.append(" ".join((
+                f"{self._titles[section_index]}\n{self._contents[section_index]}",
+                fact_value,
+                *details[3 * i:3 * i + 3],
+            )))
         
         document_text = "\n\n".join(document_parts)
         
         # Select a question
-        question_text, expected_part = random.choice(self.questions)
+        question_text, expected_part = self._random.choice(self.questions)
         
-        # Find the section that contains the answer
-        answer_section = None
-        for section in selected_sections:
-            if expected_part.lower() in section['content'].lower():
-                answer_section = section
-                break
+        # Use the section that contains the answer, if it was selected
+        answer_index = self._answer_index.get(expected_part)
         
-        if answer_section:
-            expected_answer = answer_section['content']
+        if answer_index is not None and answer_index in selected_indices:
+            expected_answer = self._contents[answer_index]
+            expected_id = self._titles[answer_index]
         else:
             # Fallback: use a fact from the document
-            fact_key = random.choice(list(key_facts.keys()))
+            fact_key = self._random.choice(list(key_facts.keys()))
             expected_answer = key_facts[fact_key]
+            expected_id = None
         
         # Build context
-        self.context_manager.clear()
-        self.context_manager.create("user", document_text)
+        self.set_context(document_text)
         
         return {
             "context": document_text,
             "question": question_text,
             "expected_answer": expected_answer,
-            "num_sections": len(selected_sections),
+            "num_sections": len(selected_indices),
             "metadata": {
                 "context_length": self.get_context_length(),
-                "sections": [s['title'] for s in selected_sections]
+                "sections": [self._titles[i] for i in selected_indices],
+                "expected_id": expected_id
             }
         }
     
     def evaluate(self, response: str, expected: str, **kwargs) -> Dict[str, Any]:
         """Evaluate comprehension of the document."""
-        response_lower = response.lower().strip()
-        expected_lower = expected.lower().strip()
+        # split() ignores surrounding whitespace, so no strip() is needed
+        response_lower = response.casefold()
+        _, expected_words, key_terms = self.expected_terms(expected, kwargs.get("expected_id"))
         
-        # Check for key phrases from expected answer
-        expected_words = set(expected_lower.split())
-        response_words = set(response_lower.split())
-        common_words = expected_words.intersection(response_words)
+        # Check for key phrases from expected answer. The response is split
+        # once and reused for both scores.
+        response_words = frozenset(response_lower.split())
+        common_words = expected_words & response_words
         
         # Calculate overlap
         if len(expected_words) > 0:
@@ -133,9 +146,8 @@ class BrowseCompBenchmark(BaseBenchmark):
         else:
             word_overlap = 0
         
-        # Check for semantic similarity (simple: key terms)
-        key_terms = [w for w in expected_words if len(w) > 4]  # Longer words are more meaningful
-        found_terms = sum(1 for term in key_terms if term in response_lower)
+        # Check for semantic similarity (simple: key terms, i.e. longer words)
+        found_terms = sum(1 for term in key_terms if term in response_words)
         term_score = found_terms / len(key_terms) if key_terms else 0
         
         # Combined score
@@ -1,15 +1,15 @@
 #!/usr/bin/env python3
-import random
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from benchmarks.base_benchmark import BaseBenchmark
 
 class CodeQABenchmark(BaseBenchmark):
     """CodeQA: Tests ability to answer questions about code in long contexts."""
     
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
         super().__init__(
             name="CodeQA",
-            description="Tests ability to understand and answer questions about code in long contexts"
+            description="Tests ability to understand and answer questions about code in long contexts",
+            seed=seed
         )
         self.code_snippets = [
             {
@@ -68,17 +68,8 @@ def binary_search(arr, target):
                 "answer": "O(log n)"
             },
         ]
-    
-    def generate_test_case(self, context_length: int, **kwargs) -> Dict[str, Any]:
-        """Generate a CodeQA test case."""
-        # Select a code snippet
-        snippet_data = random.choice(self.code_snippets)
-        code = snippet_data["code"]
-        question = snippet_data["question"]
-        answer = snippet_data["answer"]
-        
-        # Generate documentation/filler text
-        doc_sentences = [
+        # Documentation/filler text
+        self.doc_sentences = (
             "This code implements a common algorithm.",
             "The function is well-documented and follows best practices.",
             "Error handling is included for edge cases.",
@@ -89,31 +80,35 @@ def binary_search(arr, target):
             "The code follows standard coding conventions.",
             "Additional helper functions may be needed.",
             "This implementation is suitable for production use.",
-        ]
+        )
+        self._doc_sentence_tokens = self.pool_token_counts(self.doc_sentences)
+        # Constant parts of the context; filler goes before and after the code
+        self._context_template = "{filler}\n\nHere is the code:\n\n{code}\n\n{filler}"
+        for i, snippet in enumerate(self.code_snippets):
+            self._expected_cache[f"snippet_{i}"] = self.analyze_expected(snippet["answer"])
+    
+    def generate_test_case(self, context_length: int, **kwargs) -> Dict[str, Any]:
+        """Generate a CodeQA test case."""
+        # Select a code snippet
+        snippet_index = self._random.randrange(len(self.code_snippets))
+        snippet_data = self.code_snippets[snippet_index]
+        code = snippet_data["code"]
+        question = snippet_data["question"]
+        answer = snippet_data["answer"]
         
-        # Estimate filler needed
+        # Filler appears before and after the code, so each block gets half
+        # of the remaining token budget
         code_tokens = self.count_tokens(code)
-        target_tokens = context_length
-        filler_per_sentence = 10
-        
-        num_filler = max(5, (target_tokens - code_tokens) // filler_per_sentence)
+        filler_budget = (context_length - code_tokens) // 2
         
         # Build context
-        filler_text = " ".join(random.choices(doc_sentences, k=num_filler))
+        filler_text = " ".join(self.sample_to_budget(
+            self.doc_sentences, self._doc_sentence_tokens, filler_budget, min_count=5))
         
-        context_text = f"""
-{filler_text}
-
-Here is the code:
-
-{code}
-
-{filler_text}
-""".strip()
+        context_text = self._context_template.format(filler=filler_text, code=code)
         
         # Build context
-        self.context_manager.clear()
-        self.context_manager.create("user", context_text)
+        self.set_context(context_text)
         
         return {
             "context": context_text,
@@ -122,14 +117,15 @@ Here is the code:
             "code": code,
             "metadata": {
                 "context_length": self.get_context_length(),
-                "code_tokens": code_tokens
+                "code_tokens": code_tokens,
+                "expected_id": f"snippet_{snippet_index}"
             }
         }
     
     def evaluate(self, response: str, expected: str, **kwargs) -> Dict[str, Any]:
         """Evaluate the code-related answer."""
-        response_lower = response.lower().strip()
-        expected_lower = expected.lower().strip()
+        response_lower = self.normalize(response)
+        expected_lower, expected_terms, _ = self.expected_terms(expected, kwargs.get("expected_id"))
         
         # Exact match
         exact_match = expected_lower == response_lower
@@ -138,10 +134,7 @@ Here is the code:
         contains_match = expected_lower in response_lower
         
         # Check for key terms
-        expected_terms = set(expected_lower.split())
-        response_terms = set(response_lower.split())
-        common_terms = expected_terms.intersection(response_terms)
-        partial_score = len(common_terms) / len(expected_terms) if expected_terms else 0
+        partial_score = self.word_overlap(expected_terms, response_lower)
         
         score = 1.0 if exact_match else (0.8 if contains_match else min(0.6, partial_score))
         
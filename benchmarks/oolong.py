@@ -1,47 +1,53 @@
 #!/usr/bin/env python3
-import random
-from typing import Dict, Any, List
-from benchmarks.base_benchmark import BaseBenchmark
+from typing import Dict, Any, List, Optional
+from benchmarks.base_benchmark import BaseBenchmark, FillerCorpus
 
 class OOLONGBenchmark(BaseBenchmark):
     """OOLONG: Out-Of-LOng-context Needle benchmark."""
     
-    def __init__(self):
+    FILLER_SENTENCES = (
+        "This is contextual information that serves as padding.",
+        "The following paragraphs contain various details.",
+        "Additional context is provided here for length.",
+        "More information follows in subsequent sentences.",
+        "These sentences add to the overall context length.",
+        "Further details are included in this section.",
+        "Additional padding text is inserted here.",
+        "More contextual information follows.",
+        "This paragraph contains supplementary details.",
+        "Further information is provided in this section.",
+    )
+    
+    def __init__(self, seed: Optional[int] = None):
         super().__init__(
             name="OOLONG",
-            description="Tests ability to handle information at various positions in long contexts"
+            description="Tests ability to handle information at various positions in long contexts",
+            seed=seed
         )
+        # (question, context statement prefix, answer)
         self.facts = [
-            ("The capital of France is", "Paris"),
-            ("The largest planet in our solar system is", "Jupiter"),
-            ("The speed of light is approximately", "300,000 km/s"),
-            ("The author of '1984' is", "George Orwell"),
-            ("The chemical symbol for gold is", "Au"),
-            ("The tallest mountain on Earth is", "Mount Everest"),
-            ("The smallest country in the world is", "Vatican City"),
-            ("The longest river in the world is", "the Nile"),
-            ("The first person to walk on the moon was", "Neil Armstrong"),
-            ("The programming language Python was created by", "Guido van Rossum"),
+            ("What is the capital of France?", "The capital of France is", "Paris"),
+            ("What is the largest planet in our solar system?", "The largest planet in our solar system is", "Jupiter"),
+            ("What is the speed of light?", "The speed of light is approximately", "300,000 km/s"),
+            ("Who is the author of '1984'?", "The author of '1984' is", "George Orwell"),
+            ("What is the chemical symbol for gold?", "The chemical symbol for gold is", "Au"),
+            ("What is the tallest mountain on Earth?", "The tallest mountain on Earth is", "Mount Everest"),
+            ("What is the smallest country in the world?", "The smallest country in the world is", "Vatican City"),
+            ("What is the longest river in the world?", "The longest river in the world is", "the Nile"),
+            ("Who was the first person to walk on the moon?", "The first person to walk on the moon was", "Neil Armstrong"),
+            ("Who created the programming language Python?", "The programming language Python was created by", "Guido van Rossum"),
         ]
+        self._filler = FillerCorpus(self.FILLER_SENTENCES, rng=self._rng)
+        # (question, answer, context statement), formatted once
+        self._facts = [(question, answer, f"{prefix} {answer}.") for question, prefix, answer in self.facts]
+        # Answers are drawn from a fixed pool, so they key the expected cache
+        for *_, answer in self.facts:
+            self._expected_cache[answer] = self.analyze_expected(answer)
     
     def generate_test_case(self, context_length: int, fact_position: str = "random", **kwargs) -> Dict[str, Any]:
         """Generate an OOLONG test case."""
         # Select a fact
-        fact_question, fact_answer = random.choice(self.facts)
-        
-        # Generate filler text
-        filler_sentences = [
-            "This is contextual information that serves as padding.",
-            "The following paragraphs contain various details.",
-            "Additional context is provided here for length.",
-            "More information follows in subsequent sentences.",
-            "These sentences add to the overall context length.",
-            "Further details are included in this section.",
-            "Additional padding text is inserted here.",
-            "More contextual information follows.",
-            "This paragraph contains supplementary details.",
-            "Further information is provided in this section.",
-        ]
+        question, fact_answer, fact_statement = self._random.choice(self._facts)
         
         # Estimate number of filler blocks needed
         # Each fact + question is ~20 tokens, filler is ~10 tokens per sentence
@@ -52,32 +58,21 @@ class OOLONGBenchmark(BaseBenchmark):
         num_filler_sentences = max(5, (target_tokens - fact_tokens) // filler_per_sentence)
         
         # Build context with fact at specified position
-        context_parts = []
-        
         if fact_position == "start":
-            context_parts.append(f"{fact_question} {fact_answer}.")
-            context_parts.extend(random.choices(filler_sentences, k=num_filler_sentences))
+            filler_before = 0
         elif fact_position == "middle":
-            half = num_filler_sentences // 2
-            context_parts.extend(random.choices(filler_sentences, k=half))
-            context_parts.append(f"{fact_question} {fact_answer}.")
-            context_parts.extend(random.choices(filler_sentences, k=num_filler_sentences - half))
+            filler_before = num_filler_sentences // 2
         elif fact_position == "end":
-            context_parts.extend(random.choices(filler_sentences, k=num_filler_sentences))
-            context_parts.append(f"{fact_question} {fact_answer}.")
+            filler_before = num_filler_sentences
         else:  # random
-            pos = random.randint(0, num_filler_sentences)
-            context_parts.extend(random.choices(filler_sentences, k=pos))
-            context_parts.append(f"{fact_question} {fact_answer}.")
-            context_parts.extend(random.choices(filler_sentences, k=num_filler_sentences - pos))
+            filler_before = self._random.randint(0, num_filler_sentences)
         
-        context_text = " ".join(context_parts)
+        # One filler window with the fact spliced in
+        context_text = self._filler.weave(num_filler_sentences, [(filler_before, fact_statement)])
         
         # Build context
-        self.context_manager.clear()
-        self.context_manager.create("user", context_text)
+        self.set_context(context_text)
         
-        question = fact_question.rstrip(" is")
         expected_answer = fact_answer
         
         return {
@@ -87,14 +82,14 @@ class OOLONGBenchmark(BaseBenchmark):
             "fact_position": fact_position,
             "metadata": {
                 "context_length": self.get_context_length(),
-                "num_sentences": len(context_parts)
+                "num_sentences": num_filler_sentences + 1
             }
         }
     
     def evaluate(self, response: str, expected: str, **kwargs) -> Dict[str, Any]:
         """Evaluate the response."""
-        response_lower = response.lower().strip()
-        expected_lower = expected.lower().strip()
+        response_lower = self.normalize(response)
+        expected_lower, expected_words, _ = self.expected_terms(expected, expected)
         
         # Exact match
         exact_match = expected_lower == response_lower
@@ -103,10 +98,7 @@ class OOLONGBenchmark(BaseBenchmark):
         contains_match = expected_lower in response_lower or response_lower in expected_lower
         
         # Partial match (check for key words)
-        expected_words = set(expected_lower.split())
-        response_words = set(response_lower.split())
-        common_words = expected_words.intersection(response_words)
-        partial_score = len(common_words) / len(expected_words) if expected_words else 0
+        partial_score = self.word_overlap(expected_words, response_lower)
         
         score = 1.0 if exact_match else (0.8 if contains_match else min(0.6, partial_score))
         
@@ -1,15 +1,28 @@
 #!/usr/bin/env python3
-import random
-from typing import Dict, Any, List, Tuple
-from benchmarks.base_benchmark import BaseBenchmark
+from typing import Dict, Any, List, Tuple, Optional
+from benchmarks.base_benchmark import BaseBenchmark, FillerCorpus
 
 class OOLONGPairsBenchmark(BaseBenchmark):
     """OOLONG PAIRS: Tests ability to find and relate pairs of information in long contexts."""
     
-    def __init__(self):
+    FILLER_SENTENCES = (
+        "This paragraph contains additional contextual information.",
+        "More details are provided in the following sections.",
+        "The document continues with further explanations.",
+        "Additional context is included for completeness.",
+        "This section provides supplementary information.",
+        "Further details follow in subsequent paragraphs.",
+        "More contextual data is presented here.",
+        "The text continues with additional information.",
+        "This paragraph adds to the overall context.",
+        "Further explanations are provided below.",
+    )
+    
+    def __init__(self, seed: Optional[int] = None):
         super().__init__(
             name="OOLONG PAIRS",
-            description="Tests ability to find and relate pairs of information across long contexts"
+            description="Tests ability to find and relate pairs of information across long contexts",
+            seed=seed
         )
         self.pairs = [
             ("Alice", "engineer", "works at", "TechCorp"),
@@ -23,6 +36,16 @@ class OOLONGPairsBenchmark(BaseBenchmark):
             ("Iris", "designer", "designs", "user interfaces"),
             ("Jack", "analyst", "analyzes", "financial data"),
         ]
+        self._filler = FillerCorpus(self.FILLER_SENTENCES, rng=self._rng)
+        # (person, detail, role fact, relation fact, question), formatted once
+        self._pairs = [
+            (person, detail, f"{person} is a {role}.", f"{person} {relation} {detail}.",
+             f"What does {person} {relation}?")
+            for person, role, relation, detail in self.pairs
+        ]
+        # Answers are drawn from a fixed pool, so they key the expected cache
+        for *_, detail in self.pairs:
+            self._expected_cache[detail] = self.analyze_expected(detail)
     
     def generate_test_case(self, context_length: int, pair_separation: str = "far", **kwargs) -> Dict[str, Any]:
         """Generate an OOLONG PAIRS test case.
@@ -31,21 +54,7 @@ class OOLONGPairsBenchmark(BaseBenchmark):
             pair_separation: 'close', 'medium', 'far', or 'random'
         """
         # Select a pair
-        person, role, relation, detail = random.choice(self.pairs)
-        
-        # Generate filler sentences
-        filler_sentences = [
-            "This paragraph contains additional contextual information.",
-            "More details are provided in the following sections.",
-            "The document continues with further explanations.",
-            "Additional context is included for completeness.",
-            "This section provides supplementary information.",
-            "Further details follow in subsequent paragraphs.",
-            "More contextual data is presented here.",
-            "The text continues with additional information.",
-            "This paragraph adds to the overall context.",
-            "Further explanations are provided below.",
-        ]
+        person, detail, role_fact, relation_fact, question = self._random.choice(self._pairs)
         
         # Determine separation distance
         if pair_separation == "close":
@@ -55,7 +64,7 @@ class OOLONGPairsBenchmark(BaseBenchmark):
         elif pair_separation == "far":
             separation = 30
         else:  # random
-            separation = random.randint(2, 30)
+            separation = self._random.randint(2, 30)
         
         # Estimate sentences needed
         target_tokens = context_length
@@ -64,25 +73,13 @@ class OOLONGPairsBenchmark(BaseBenchmark):
         
         num_filler = max(separation, (target_tokens - pair_tokens) // filler_per_sentence)
         
-        # Build context with pair separated
-        context_parts = []
-        
-        # First fact
-        context_parts.append(f"{person} is a {role}.")
-        context_parts.extend(random.choices(filler_sentences, k=separation))
-        
-        # Second fact
-        context_parts.append(f"{person} {relation} {detail}.")
-        context_parts.extend(random.choices(filler_sentences, k=num_filler - separation))
-        
-        context_text = " ".join(context_parts)
+        # Build context with pair separated, from one filler window
+        context_text = self._filler.weave(num_filler, [(0, role_fact), (separation, relation_fact)])
         
         # Build context
-        self.context_manager.clear()
-        self.context_manager.create("user", context_text)
+        self.set_context(context_text)
         
         # Question asks to relate the pair
-        question = f"What does {person} {relation}?"
         expected_answer = detail
         
         return {
@@ -94,14 +91,14 @@ class OOLONGPairsBenchmark(BaseBenchmark):
             "separation_distance": separation,
             "metadata": {
                 "context_length": self.get_context_length(),
-                "num_sentences": len(context_parts)
+                "num_sentences": num_filler + 2
             }
         }
     
     def evaluate(self, response: str, expected: str, **kwargs) -> Dict[str, Any]:
         """Evaluate if the pair relationship was correctly identified."""
-        response_lower = response.lower().strip()
-        expected_lower = expected.lower().strip()
+        response_lower = self.normalize(response)
+        expected_lower, expected_words, _ = self.expected_terms(expected, expected)
         
         # Exact match
         exact_match = expected_lower == response_lower
@@ -110,10 +107,7 @@ class OOLONGPairsBenchmark(BaseBenchmark):
         contains_match = expected_lower in response_lower
         
         # Check for key words from expected answer
-        expected_words = set(expected_lower.split())
-        response_words = set(response_lower.split())
-        common_words = expected_words.intersection(response_words)
-        partial_score = len(common_words) / len(expected_words) if expected_words else 0
+        partial_score = self.word_overlap(expected_words, response_lower)
         
         score = 1.0 if exact_match else (0.8 if contains_match else min(0.6, partial_score))
         
@@ -1,21 +1,10 @@
 #!/usr/bin/env python3
-import os
 import sys
-from openai import OpenAI
-from dotenv import load_dotenv
-
-load_dotenv()
-
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    print("Error: OPENAI_API_KEY not found in .env file")
-    sys.exit(1)
-
-client = OpenAI(api_key=api_key)
+from openai_client import get_client
 
 def chat(message):
     try:
-        response = client.chat.completions.create(
+        response = get_client().chat.completions.create(
             model="gpt-4o",
             messages=[
                 {"role": "user", "content": message}
@@ -26,6 +15,12 @@ def chat(message):
         return f"Error: {str(e)}"
 
 if __name__ == "__main__":
+    try:
+        get_client()
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
     if len(sys.argv) > 1:
         message = " ".join(sys.argv[1:])
         print(chat(message))
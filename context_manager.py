@@ -1,10 +1,86 @@
 #!/usr/bin/env python3
-from typing import List, Dict, Any, Optional, Union
+from collections import Counter, defaultdict, deque
+from functools import lru_cache
+from io import StringIO
+from itertools import count, islice
+from operator import itemgetter
+from typing import Deque, List, Dict, Any, Optional, Union, Callable, Tuple, Iterator
+import heapq
 import json
+import math
+import os
+import re
+import sys
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Terms indexed for search()
+_WORD_RE = re.compile(r"\w+")
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize to indented JSON bytes, using orjson when available."""
+    if ORJSON_AVAILABLE:
+        # OPT_NON_STR_KEYS: stringify int metadata keys, as json.dumps does
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2).encode()
+
+def _loads(data: bytes) -> Any:
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (1 token ≈ 4 chars)."""
+    return len(text) // 4
+
+@lru_cache(maxsize=None)
+def model_token_counter(model: str) -> Callable[[str], int]:
+    """Token counter using the tiktoken encoding for model, built once per model.
+    
+    Falls back to estimate_tokens if tiktoken can't provide the encoding.
+    """
+    if tiktoken is None:
+        return estimate_tokens
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except Exception:
+        # Unknown model, or the encoding file can't be downloaded
+        return estimate_tokens
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
 
 class ContextManager:
-    def __init__(self):
-        self.context: List[Dict[str, Any]] = []
+    _message = itemgetter("_message")
+    # BM25 term-frequency saturation and length normalization
+    BM25_K1 = 1.5
+    BM25_B = 0.75
+    # Characters of content kept as each entry's cached preview
+    PREVIEW_LENGTH = 300
+    
+    def __init__(self, token_counter: Optional[Callable[[str], int]] = None):
+        # A deque so trimming the oldest entries is O(1)
+        self.context: Deque[Dict[str, Any]] = deque()
+        self.count_tokens = token_counter or estimate_tokens
+        self.token_count = 0
+        self._total_chars = 0
+        self._role_counts: Counter = Counter()
+        # Bumped whenever an entry's role or content changes, is added or is
+        # removed, so callers can tell if the messages changed since they looked
+        self.version = 0
+        # Inverted index for search(): term -> {entry id: term frequency}.
+        # Built on the first search, then kept up to date by _track/_untrack
+        self._postings: Optional[Dict[str, Dict[int, int]]] = None
+        self._indexed: Dict[int, Dict[str, Any]] = {}
+        self._indexed_length = 0
+        self._entry_ids = count()
     
     def create(self, role: str, content: str, metadata: Optional[Dict] = None) -> int:
         """Add a new context entry. Returns the index."""
@@ -13,9 +89,22 @@ class ContextManager:
             "content": content,
             "metadata": metadata or {}
         }
+        self._track(entry)
         self.context.append(entry)
         return len(self.context) - 1
     
+    def insert(self, index: int, role: str, content: str, metadata: Optional[Dict] = None) -> int:
+        """Insert a new context entry before index. Returns its index."""
+        entry = {
+            "role": role,
+            "content": content,
+            "metadata": metadata or {}
+        }
+        self._track(entry)
+        index = max(0, min(index, len(self.context)))
+        self.context.insert(index, entry)
+        return index
+    
     def read(self, index: Optional[int] = None, start: Optional[int] = None, 
              end: Optional[int] = None, role: Optional[str] = None) -> Union[Dict, List[Dict]]:
         """Read context entries.
@@ -30,27 +119,44 @@ class ContextManager:
                 return self.context[index]
             return None
         
-        result = self.context
-        if start is not None or end is not None:
-            result = result[start:end]
+        result = self._slice(start, end)
         
         if role:
+            role = sys.intern(role)
             result = [entry for entry in result if entry.get("role") == role]
         
         return result
     
+    def iter_range(self, start: Optional[int] = None, end: Optional[int] = None,
+                   role: Optional[str] = None) -> Iterator[Dict]:
+        """Iterate over entries in [start:end], optionally filtered by role.
+        
+        Unlike read(), no list is built. Modifying the context while
+        iterating is undefined.
+        """
+        start, end = self._bounds(start, end)
+        entries = islice(self.context, start, end)
+        if role:
+            role = sys.intern(role)
+            return filter(lambda entry: entry.get("role") == role, entries)
+        return entries
+    
     def update(self, index: int, role: Optional[str] = None, 
                content: Optional[str] = None, metadata: Optional[Dict] = None) -> bool:
         """Update a context entry by index."""
         if not 0 <= index < len(self.context):
             return False
         
-        if role:
-            self.context[index]["role"] = role
-        if content:
-            self.context[index]["content"] = content
+        entry = self.context[index]
+        if role or content:
+            self._untrack(entry)
+            if role:
+                entry["role"] = role
+            if content:
+                entry["content"] = content
+            self._track(entry)
         if metadata:
-            self.context[index]["metadata"].update(metadata)
+            entry["metadata"].update(metadata)
         
         return True
     
@@ -65,86 +171,235 @@ class ContextManager:
         """
         if index is not None:
             if 0 <= index < len(self.context):
+                self._untrack(self.context[index])
                 del self.context[index]
                 return 1
             return 0
         
         if start is not None or end is not None:
-            deleted = len(self.context[start:end])
-            del self.context[start:end]
-            return deleted
+            # Rotate the range to the left end, pop it, and rotate back
+            start, end = self._bounds(start, end)
+            context = self.context
+            context.rotate(-start)
+            for _ in range(end - start):
+                self._untrack(context.popleft())
+            context.rotate(start)
+            return end - start
         
         if role:
-            original_len = len(self.context)
-            self.context = [entry for entry in self.context if entry.get("role") != role]
-            return original_len - len(self.context)
+            role = sys.intern(role)
+            # One pass around the deque, re-appending the kept entries
+            popleft, append, untrack = self.context.popleft, self.context.append, self._untrack
+            deleted = 0
+            for _ in range(len(self.context)):
+                entry = popleft()
+                if entry.get("role") != role:
+                    append(entry)
+                else:
+                    untrack(entry)
+                    deleted += 1
+            return deleted
         
         return 0
     
     def clear(self):
         """Clear all context."""
         self.context.clear()
+        self._reset_totals()
     
     def size(self) -> int:
         """Get total number of context entries."""
         return len(self.context)
     
     def get_messages(self) -> List[Dict[str, str]]:
-        """Get context in OpenAI message format."""
-        return [{"role": entry["role"], "content": entry["content"]} 
-                for entry in self.context]
+        """Get context in OpenAI message format.
+        
+        The message dicts are prebuilt by _track(); the returned list is new,
+        so callers can append to it, but shouldn't mutate the messages.
+        """
+        return list(map(self._message, self.context))
+    
+    # Accessors for the fields _track() caches on each entry; use these rather
+    # than the underscore keys
+    @staticmethod
+    def message_of(entry: Dict[str, Any]) -> Dict[str, str]:
+        """Entry as an OpenAI-format message (shared, so don't mutate it)."""
+        return entry["_message"]
+    
+    @staticmethod
+    def tokens_of(entry: Dict[str, Any]) -> int:
+        """Token count of the entry's content."""
+        return entry["_tokens"]
+    
+    @classmethod
+    def preview_of(cls, entry: Dict[str, Any], length: int = PREVIEW_LENGTH) -> str:
+        """First length characters of the entry's content."""
+        if length > cls.PREVIEW_LENGTH:
+            return entry["content"][:length]
+        return entry["_preview"][:length]
     
     def search(self, query: str, limit: Optional[int] = None) -> List[Dict]:
-        """Simple text search in context content."""
-        results = []
-        query_lower = query.lower()
-        for entry in self.context:
-            if query_lower in entry["content"].lower():
-                results.append(entry)
-                if limit and len(results) >= limit:
-                    break
-        return results
+        """Entries sharing a word with query, best BM25 match first."""
+        if self._postings is None:
+            self._build_index()
+        indexed = self._indexed
+        n = len(indexed)
+        if not n:
+            return []
+        
+        k1, b = self.BM25_K1, self.BM25_B
+        avg_length = self._indexed_length / n or 1
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(_WORD_RE.findall(query.lower())):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for entry_id, tf in postings.items():
+                norm = k1 * (1 - b + b * indexed[entry_id]["_length"] / avg_length)
+                scores[entry_id] += idf * tf * (k1 + 1) / (tf + norm)
+        
+        if limit:
+            ranked = heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+        else:
+            ranked = sorted(scores.items(), key=itemgetter(1), reverse=True)
+        return [indexed[entry_id] for entry_id, _ in ranked]
     
     def compact(self, start: Optional[int] = None, end: Optional[int] = None,
                 max_length: int = 500) -> str:
         """Get compacted/summarized view of context range."""
-        target = self.context[start:end] if start is not None or end is not None else self.context
+        target = self._slice(start, end) if start is not None or end is not None else self.context
         
         if not target:
             return "No context to compact."
         
-        compacted = []
+        # Write straight into one buffer rather than joining per-entry strings
+        buf = StringIO()
+        separator = ""
         for entry in target:
+            buf.write(separator)
+            buf.write(entry["_prefix"])
             content = entry["content"]
             if len(content) > max_length:
-                content = content[:max_length] + "..."
-            compacted.append(f"[{entry['role']}]: {content}")
+                buf.write(content[:max_length])
+                buf.write("...")
+            else:
+                buf.write(content)
+            separator = "\n"
         
-        return "\n".join(compacted)
+        return buf.getvalue()
     
     def save(self, filepath: str):
-        """Save context to JSON file."""
-        with open(filepath, 'w') as f:
-            json.dump(self.context, f, indent=2)
+        """Save context to JSON file.
+        
+        The file is written to a temporary path and moved into place, so an
+        interrupted save leaves any previous file intact.
+        """
+        data = _dumps([self._public(entry) for entry in self.context])
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, filepath)
     
     def load(self, filepath: str):
         """Load context from JSON file."""
-        with open(filepath, 'r') as f:
-            self.context = json.load(f)
+        with open(filepath, 'rb') as f:
+            self.context = deque(_loads(f.read()))
+        self._reset_totals()
+        for entry in self.context:
+            self._track(entry)
     
     def stats(self) -> Dict[str, Any]:
         """Get statistics about the context."""
-        roles = {}
-        total_chars = 0
-        for entry in self.context:
-            role = entry.get("role", "unknown")
-            roles[role] = roles.get(role, 0) + 1
-            total_chars += len(entry.get("content", ""))
-        
         return {
             "total_entries": len(self.context),
-            "total_characters": total_chars,
-            "roles": roles,
-            "average_length": total_chars / len(self.context) if self.context else 0
+            "total_characters": self._total_chars,
+            "roles": dict(self._role_counts),
+            "average_length": self._total_chars / len(self.context) if self.context else 0
         }
-
+    
+    def _bounds(self, start: Optional[int], end: Optional[int]) -> Tuple[int, int]:
+        """Normalize start/end with slice semantics to 0 <= start <= end <= len."""
+        span = range(len(self.context))[start:end]
+        return span.start, max(span.start, span.stop)
+    
+    def _slice(self, start: Optional[int], end: Optional[int]) -> List[Dict[str, Any]]:
+        """Entries in [start:end], as a new list (deques can't be sliced)."""
+        start, end = self._bounds(start, end)
+        return list(islice(self.context, start, end))
+    
+    def _track(self, entry: Dict[str, Any]):
+        """Compute cached per-entry fields and add the entry to running totals.
+        
+        Cached fields are stored under underscore-prefixed keys and are not
+        written by save().
+        """
+        content = entry.get("content", "")
+        role = entry.get("role")
+        if isinstance(role, str):
+            # Roles come from a tiny set; interned, role comparisons in
+            # delete()/read() usually succeed on identity alone
+            role = entry["role"] = sys.intern(role)
+        entry["_tokens"] = self.count_tokens(content)
+        entry["_message"] = {"role": role, "content": content}
+        entry["_prefix"] = f"[{role}]: "
+        entry["_preview"] = content[:self.PREVIEW_LENGTH]
+        self.token_count += entry["_tokens"]
+        self.version += 1
+        self._total_chars += len(content)
+        self._role_counts[entry.get("role", "unknown")] += 1
+        if self._postings is not None:
+            self._index(entry)
+    
+    def _untrack(self, entry: Dict[str, Any]):
+        """Remove an entry from running totals."""
+        self.token_count -= entry.get("_tokens", 0)
+        self.version += 1
+        self._total_chars -= len(entry.get("content", ""))
+        role = entry.get("role", "unknown")
+        self._role_counts[role] -= 1
+        if not self._role_counts[role]:
+            del self._role_counts[role]
+        if self._postings is not None:
+            self._unindex(entry)
+    
+    def _reset_totals(self):
+        self.token_count = 0
+        self.version += 1
+        self._total_chars = 0
+        self._role_counts.clear()
+        if self._postings is not None:
+            self._postings.clear()
+            self._indexed.clear()
+            self._indexed_length = 0
+    
+    def _build_index(self):
+        self._postings = {}
+        for entry in self.context:
+            self._index(entry)
+    
+    def _index(self, entry: Dict[str, Any]):
+        terms = entry["_terms"] = Counter(_WORD_RE.findall(entry.get("content", "").lower()))
+        entry["_length"] = length = sum(terms.values())
+        entry_id = entry["_id"] = next(self._entry_ids)
+        self._indexed[entry_id] = entry
+        self._indexed_length += length
+        postings = self._postings
+        for term, tf in terms.items():
+            postings.setdefault(term, {})[entry_id] = tf
+    
+    def _unindex(self, entry: Dict[str, Any]):
+        entry_id = entry["_id"]
+        del self._indexed[entry_id]
+        self._indexed_length -= entry["_length"]
+        postings = self._postings
+        for term in entry["_terms"]:
+            term_postings = postings[term]
+            del term_postings[entry_id]
+            if not term_postings:
+                del postings[term]
+    
+    @staticmethod
+    def _public(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Entry without cached (underscore-prefixed) fields."""
+        return {k: v for k, v in entry.items() if not k.startswith("_")}
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+from typing import Sequence
+import numpy as np
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+# Most inputs the embeddings endpoint accepts in one request
+MAX_BATCH = 2048
+# Inputs are cut to this many characters. Text rarely runs over one token per
+# character, so this stays under the 8191-token input limit; one oversized
+# input would otherwise fail its whole batch
+MAX_INPUT_CHARS = 8000
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row, so dot products are cosine similarities."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+def embed_texts(client, texts: Sequence[str], model: str = EMBEDDING_MODEL) -> np.ndarray:
+    """Embed texts (each cut to MAX_INPUT_CHARS), MAX_BATCH inputs per request.
+    
+    Returns:
+        float32 array of shape (len(texts), dim) with L2-normalized rows
+    """
+    rows = []
+    for i in range(0, len(texts), MAX_BATCH):
+        response = client.embeddings.create(model=model, input=[text[:MAX_INPUT_CHARS] for text in texts[i:i + MAX_BATCH]])
+        rows.extend(item.embedding for item in response.data)
+    return normalize_rows(np.array(rows, dtype=np.float32))
@@ -50,6 +50,6 @@ print(test_case['code'][:200] + "...")
 
 print("\n" + "=" * 60)
 print("To run full benchmarks with API calls:")
-print("  python benchmarks/benchmark_runner.py --benchmark all")
+print("  python -m benchmarks.benchmark_runner --benchmark all")
 print("=" * 60)
 
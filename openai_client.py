@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+import importlib.util
+import os
+from functools import cache
+import httpx
+from openai import OpenAI
+from dotenv import load_dotenv
+
+# httpx needs the h2 package for HTTP/2
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+@cache
+def get_client() -> OpenAI:
+    """Shared OpenAI client, created (and .env loaded) on first use.
+    
+    Raises:
+        RuntimeError: if OPENAI_API_KEY isn't set
+    """
+    load_dotenv()
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("OPENAI_API_KEY not found in .env file")
+    # Keep-alive pool so repeated calls reuse connections
+    http_client = httpx.Client(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_keepalive_connections=20),
+        timeout=httpx.Timeout(60.0, connect=10.0)
+    )
+    return OpenAI(api_key=api_key, http_client=http_client)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+import os
+import time
+from typing import List, Optional, Tuple
+import numpy as np
+
+class SemanticCache:
+    """Responses keyed by prompt embedding, matched by cosine similarity.
+    
+    Embeddings are kept L2-normalized in one (N, dim) float32 matrix, so a
+    lookup is a single matrix-vector product. Rows expire after `ttl`
+    seconds, and the least recently used row is evicted once
+    `max_entries` is reached.
+    """
+    
+    def __init__(self, threshold: float = 0.92, max_entries: int = 256,
+                 ttl: Optional[float] = 3600.0):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._embeddings: Optional[np.ndarray] = None
+        self._entries: List[Tuple[str, str]] = []
+        self._created = np.empty(0, dtype=np.float64)
+        self._last_used = np.empty(0, dtype=np.float64)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def lookup(self, embedding: np.ndarray) -> Optional[str]:
+        """Cached response for the closest prompt at or above the threshold, if any."""
+        self._expire()
+        if not self._entries:
+            return None
+        
+        sims = self._embeddings @ embedding
+        best = int(np.argmax(sims))
+        if sims[best] < self.threshold:
+            return None
+        self._last_used[best] = time.time()
+        return self._entries[best][1]
+    
+    def add(self, embedding: np.ndarray, prompt: str, response: str):
+        """Cache response under the (normalized) prompt embedding."""
+        self._expire()
+        if len(self._entries) >= self.max_entries:
+            self._remove(np.array([np.argmin(self._last_used)]))
+        
+        now = time.time()
+        row = embedding.astype(np.float32, copy=False)[np.newaxis, :]
+        self._embeddings = row if self._embeddings is None else np.vstack((self._embeddings, row))
+        self._entries.append((prompt, response))
+        self._created = np.append(self._created, now)
+        self._last_used = np.append(self._last_used, now)
+    
+    def clear(self):
+        """Drop all cached responses."""
+        self._embeddings = None
+        self._entries = []
+        self._created = np.empty(0, dtype=np.float64)
+        self._last_used = np.empty(0, dtype=np.float64)
+    
+    def save(self, filepath: str):
+        """Save the cache to an .npz file, replacing it atomically."""
+        prompts = [prompt for prompt, _ in self._entries]
+        responses = [response for _, response in self._entries]
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                embeddings=self._embeddings if self._embeddings is not None else np.empty((0, 0), dtype=np.float32),
+                prompts=np.array(prompts, dtype=str),
+                responses=np.array(responses, dtype=str),
+                created=self._created,
+                last_used=self._last_used,
+            )
+        os.replace(tmp_path, filepath)
+    
+    def load(self, filepath: str):
+        """Load a cache written by save()."""
+        with np.load(filepath, allow_pickle=False) as data:
+            self._entries = list(zip(data["prompts"].tolist(), data["responses"].tolist()))
+            self._embeddings = data["embeddings"] if self._entries else None
+            self._created = data["created"]
+            self._last_used = data["last_used"]
+    
+    def _expire(self):
+        if self.ttl is None or not self._entries:
+            return
+        expired = np.flatnonzero(self._created < time.time() - self.ttl)
+        if len(expired):
+            self._remove(expired)
+    
+    def _remove(self, rows: np.ndarray):
+        keep = np.ones(len(self._entries), dtype=bool)
+        keep[rows] = False
+        self._entries = [entry for entry, kept in zip(self._entries, keep) if kept]
+        self._embeddings = self._embeddings[keep] if self._entries else None
+        self._created = self._created[keep]
+        self._last_used = self._last_used[keep]
@@ -1,10 +1,16 @@
 #!/usr/bin/env python3
+import json
 import os
+import re
 import sys
-from typing import List, Dict, Optional
+from functools import cached_property
+import numpy as np
+from typing import Any, Iterator, List, Dict, Optional, Tuple
 from openai import OpenAI
-from dotenv import load_dotenv
-from context_manager import ContextManager
+from context_manager import ContextManager, model_token_counter
+from embeddings import embed_texts
+from openai_client import get_client
+from semantic_cache import SemanticCache
 
 try:
     from visualizer import ConversationVisualizer
@@ -12,48 +18,194 @@ try:
 except ImportError:
     VISUALIZER_AVAILABLE = False
 
-load_dotenv()
+# Messages made only of these words have nothing worth retrieving context for
+SMALL_TALK_WORDS = frozenset((
+    "hi", "hello", "hey", "thanks", "thank", "you", "thx", "ok", "okay", "k",
+    "yes", "yeah", "yep", "no", "nope", "sure", "cool", "great", "nice",
+    "bye", "goodbye", "please", "what", "why", "how", "really", "right",
+    "good", "morning", "evening", "there", "lol", "hmm",
+))
+WORD_RE = re.compile(r"[\w']+")
 
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    print("Error: OPENAI_API_KEY not found in .env file")
-    sys.exit(1)
-
-client = OpenAI(api_key=api_key)
+# Content of the system entry that replaces summarized turns
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
 
 class Smithers:
     def __init__(self):
-        self.client = client
-        self.context_manager = ContextManager()
         self.model = "gpt-4o"
+        self.context_manager = ContextManager(token_counter=model_token_counter(self.model))
+        # Replies to earlier, semantically equivalent messages
+        self.response_cache = SemanticCache()
+        # (response id, context version right after that reply was recorded).
+        # While the context is unchanged, the next turn sends only the new
+        # message and chains on the stored server-side response.
+        self._thread: Optional[Tuple[str, int]] = None
+        # Embeddings of entry contents for rag_search, one row per distinct
+        # content; rows are appended as new contents are first searched
+        self.entry_embeddings: Optional[np.ndarray] = None
+        self._embedding_rows: Dict[str, int] = {}
+        # Entries less similar than this to the query aren't retrieved
+        self.rag_min_similarity = 0.25
+        # Past this many context tokens, older turns are folded into a summary
+        self.summary_threshold = 6000
+        self.keep_recent = 6
+        # ...but only once those turns hold this many tokens, so a context whose
+        # recent turns alone are over the threshold isn't re-summarized each turn
+        self.summary_min_tokens = 1500
+        # Full-context requests are trimmed to fit the model's window, leaving
+        # room for the reply
+        self.context_budget = 128_000
+        self.reply_reserve = 4096
+    
+    @cached_property
+    def client(self) -> OpenAI:
+        """OpenAI client, built on the first API call (or set one directly)."""
+        return get_client()
     
-    def chat(self, message: str, use_context: bool = True) -> str:
-        """Chat with Smithers. Optionally uses context."""
+    def chat(self, message: str, use_context: bool = True, use_cache: bool = True) -> str:
+        """Chat with Smithers. Optionally uses context.
+        
+        With use_cache, a message close enough to an earlier one (by
+        embedding similarity) gets the earlier reply without a completion call.
+        Only requests sent without context use the cache: with context, the
+        same words ("tell me more") can ask for a different reply.
+        """
         try:
-            messages = []
-            if use_context and self.context_manager.size() > 0:
-                messages = self.context_manager.get_messages()
-            
-            messages.append({"role": "user", "content": message})
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages
-            )
+            return self._complete(message, use_context, use_cache)
+        except Exception as e:
+            return f"Error: {str(e)}"
+    
+    def _complete(self, message: str, use_context: bool, use_cache: bool) -> str:
+        """chat() without the error handling: API failures raise."""
+        query_embedding, cached = self._check_cache(message, use_cache, use_context)
+        if cached is not None:
+            self._record(message, cached, None, None, use_context)
+            return cached
+        
+        response = self.client.responses.create(**self._build_request(message, use_context))
+        
+        assistant_message = response.output_text
+        self._record(message, assistant_message, response.id, query_embedding, use_context)
+        return assistant_message
+    
+    def stream_chat(self, message: str, use_context: bool = True, use_cache: bool = True) -> Iterator[str]:
+        """Like chat(), but yields the reply in chunks as they are generated.
+        
+        The full reply is recorded in the context once the stream completes.
+        """
+        try:
+            query_embedding, cached = self._check_cache(message, use_cache, use_context)
+            if cached is not None:
+                self._record(message, cached, None, None, use_context)
+                yield cached
+                return
             
-            assistant_message = response.choices[0].message.content
+            stream = self.client.responses.create(stream=True, **self._build_request(message, use_context))
             
-            if use_context:
-                self.context_manager.create("user", message)
-                self.context_manager.create("assistant", assistant_message)
+            chunks = []
+            response_id = None
+            for event in stream:
+                if event.type == "response.output_text.delta":
+                    chunks.append(event.delta)
+                    yield event.delta
+                elif event.type == "response.completed":
+                    response_id = event.response.id
+                elif event.type == "response.failed":
+                    # The reason is on the failed response, not the event
+                    error = event.response.error
+                    raise RuntimeError(getattr(error, "message", None) or "response failed")
+                elif event.type == "error":
+                    raise RuntimeError(event.message or "stream error")
             
-            return assistant_message
+            self._record(message, "".join(chunks), response_id, query_embedding, use_context)
         except Exception as e:
-            return f"Error: {str(e)}"
+            yield f"Error: {str(e)}"
+    
+    def _check_cache(self, message: str, use_cache: bool,
+                     use_context: bool) -> Tuple[Optional[np.ndarray], Optional[str]]:
+        """(message embedding, cached reply); both None when the cache isn't used.
+        
+        The cache is skipped whenever the request would carry context.
+        """
+        if not use_cache or (use_context and self.context_manager.size() > 0):
+            return None, None
+        query_embedding = self._cache_embedding(message)
+        cached = self.response_cache.lookup(query_embedding) if query_embedding is not None else None
+        return query_embedding, cached
+    
+    def _build_request(self, message: str, use_context: bool) -> Dict[str, Any]:
+        """Responses API arguments for sending message."""
+        if use_context:
+            self._summarize_if_needed()
+        
+        request: Dict[str, Any] = {"model": self.model}
+        previous_response_id = self._thread_response_id() if use_context else None
+        if previous_response_id is not None:
+            # The server already holds the rest of the conversation
+            request["previous_response_id"] = previous_response_id
+            request["input"] = message
+        elif use_context and self.context_manager.size() > 0:
+            request["input"] = self._windowed_messages(message)
+        else:
+            request["input"] = message
+        return request
+    
+    def _windowed_messages(self, message: str) -> List[Dict[str, str]]:
+        """Context messages plus message, trimmed to the token budget.
+        
+        The oldest entries that don't fit are left out; a leading summary
+        entry is always kept, and its tokens come out of the budget first.
+        """
+        cm = self.context_manager
+        budget = self.context_budget - self.reply_reserve - cm.count_tokens(message)
+        
+        first = cm.read(index=0)
+        summary = first if first is not None and first["metadata"].get("summary") else None
+        floor = 0
+        if summary is not None:
+            budget -= cm.tokens_of(summary)
+            floor = 1
+        
+        # Entries carry their token counts, so walking back costs no encoding
+        keep_from = cm.size()
+        used = 0
+        tokens_of = cm.tokens_of
+        for entry in reversed(cm.context):
+            used += tokens_of(entry)
+            if keep_from == floor or used > budget:
+                break
+            keep_from -= 1
+        
+        messages = [cm.message_of(summary)] if summary is not None else []
+        messages.extend(map(cm.message_of, cm.iter_range(keep_from)))
+        messages.append({"role": "user", "content": message})
+        return messages
     
-    def compact_context(self, start: Optional[int] = None, end: Optional[int] = None) -> str:
-        """Ask Smithers to help compact context."""
+    def _record(self, message: str, reply: str, response_id: Optional[str],
+                query_embedding: Optional[np.ndarray], use_context: bool):
+        """Cache the reply and add the turn to the context."""
+        if query_embedding is not None:
+            self.response_cache.add(query_embedding, message, reply)
+        
+        if use_context:
+            self.context_manager.create("user", message)
+            if response_id is not None:
+                self.context_manager.create("assistant", reply, {"response_id": response_id})
+                self._thread = (response_id, self.context_manager.version)
+            else:
+                self.context_manager.create("assistant", reply)
+    
+    def compact_context(self, start: Optional[int] = None, end: Optional[int] = None,
+                        previous_summary: Optional[str] = None) -> str:
+        """Ask Smithers to help compact context.
+        
+        previous_summary, if given, is included in full ahead of the
+        (truncated) entries, so a rolling summary doesn't lose content.
+        Raises if the completion request fails.
+        """
         context_preview = self.context_manager.compact(start, end, max_length=200)
+        if previous_summary:
+            context_preview = f"[summary so far]: {previous_summary}\n{context_preview}"
         
         prompt = f"""You are helping to compact and summarize context. Here's the current context:
 
@@ -61,35 +213,369 @@ class Smithers:
 
 Please provide a concise summary that captures the key information. Keep it brief and actionable."""
         
-        summary = self.chat(prompt, use_context=False)
-        return summary
+        # Every compaction prompt shares the same template, so similarity
+        # says nothing about whether a cached summary fits
+        return self._complete(prompt, use_context=False, use_cache=False)
     
     def rag_search(self, query: str, limit: int = 5) -> List[Dict]:
-        """RAG: Retrieve relevant context entries."""
-        return self.context_manager.search(query, limit=limit)
+        """RAG: Retrieve the context entries most similar to query.
+        
+        Entries are ranked by embedding similarity; those below
+        rag_min_similarity are left out, so the result may be empty. The
+        query and any contents without an embedding yet are embedded in one
+        batched request. Falls back to text search if embeddings are
+        unavailable.
+        """
+        entries = self.context_manager.read()
+        if not entries:
+            return []
+        try:
+            query_embedding = self._embed_with_pending(query, [entry["content"] for entry in entries])
+        except Exception:
+            return self.context_manager.search(query, limit=limit)
+        
+        rows = np.fromiter((self._embedding_rows[entry["content"]] for entry in entries),
+                           dtype=np.intp, count=len(entries))
+        scores = (self.entry_embeddings @ query_embedding)[rows]
+        if limit < len(scores):
+            # Top-k without sorting every score
+            top = np.argpartition(-scores, limit)[:limit]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        top = top[scores[top] >= self.rag_min_similarity]
+        return [entries[i] for i in top.tolist()]
+    
+    def _embed_with_pending(self, query: str, contents: List[str]) -> np.ndarray:
+        """Embed query together with the contents that don't have a row yet.
+        
+        New content rows are appended to entry_embeddings; returns the query
+        embedding.
+        """
+        pending = list(dict.fromkeys(c for c in contents if c not in self._embedding_rows))
+        vectors = embed_texts(self.client, pending + [query])
+        if pending:
+            new_rows = vectors[:-1]
+            offset = 0 if self.entry_embeddings is None else len(self.entry_embeddings)
+            self.entry_embeddings = new_rows if self.entry_embeddings is None else np.vstack((self.entry_embeddings, new_rows))
+            for i, content in enumerate(pending):
+                self._embedding_rows[content] = offset + i
+        return vectors[-1]
     
     def rag_enhanced_chat(self, message: str, retrieval_limit: int = 3) -> str:
-        """Chat with RAG - retrieves relevant context first."""
+        """Chat with RAG - retrieves relevant context first.
+        
+        Small talk ("ok", "thanks!") skips retrieval and its embeddings call.
+        """
+        if SMALL_TALK_WORDS.issuperset(WORD_RE.findall(message.lower())):
+            return self.chat(message, use_context=True)
         relevant = self.rag_search(message, limit=retrieval_limit)
         
         if relevant:
-            context_str = "\n".join([
-                f"[{entry['role']}]: {entry['content'][:300]}"
-                for entry in relevant
-            ])
+            # Flat list of pieces and a single join for the final string; only
+            # entries after the first get a leading newline
+            parts = []
+            extend, preview_of = parts.extend, self.context_manager.preview_of
+            separator = "["
+            for entry in relevant:
+                extend((separator, entry['role'], "]: ", preview_of(entry)))
+                separator = "\n["
+            context_str = "".join(parts)
             enhanced_message = f"""Relevant context:
 {context_str}
 
 User question: {message}"""
-            return self.chat(enhanced_message, use_context=True)
+            # The retrieved context is part of the prompt, so the cache can't
+            # tell whether an earlier reply still fits
+            return self.chat(enhanced_message, use_context=True, use_cache=False)
         else:
             return self.chat(message, use_context=True)
     
+    def _thread_response_id(self) -> Optional[str]:
+        """Response id to chain on, if the context hasn't changed since it was recorded."""
+        if self._thread is None:
+            return None
+        response_id, version = self._thread
+        return response_id if version == self.context_manager.version else None
+    
+    def _summarize_if_needed(self):
+        """Fold all but the last keep_recent entries into one system summary.
+        
+        Only runs once the context is over summary_threshold tokens and the
+        turns to fold (besides an earlier summary) hold summary_min_tokens.
+        An earlier summary is carried into the new one untruncated.
+        """
+        cm = self.context_manager
+        if cm.token_count <= self.summary_threshold or cm.size() <= self.keep_recent:
+            return
+        
+        cutoff = cm.size() - self.keep_recent
+        first = cm.read(index=0)
+        previous = first["content"].removeprefix(SUMMARY_PREFIX) if first["metadata"].get("summary") else None
+        start = 0 if previous is None else 1
+        if sum(map(cm.tokens_of, cm.iter_range(start, cutoff))) < self.summary_min_tokens:
+            return
+        
+        try:
+            summary = self.compact_context(start, cutoff, previous_summary=previous)
+        except Exception:
+            # Keep the full context; the next turn tries again
+            return
+        cm.delete(start=0, end=cutoff)
+        cm.insert(0, "system", SUMMARY_PREFIX + summary, {"summary": True})
+    
+    def save(self, filepath: str):
+        """Save the context, and the response cache next to it."""
+        self.context_manager.save(filepath)
+        self.response_cache.save(f"{filepath}.cache.npz")
+    
+    def load(self, filepath: str):
+        """Load the context, and its response cache if one was saved."""
+        self.context_manager.load(filepath)
+        # Resume the server-side thread if the context ends with its last reply
+        last = self.context_manager.read(index=self.context_manager.size() - 1)
+        response_id = last["metadata"].get("response_id") if last else None
+        self._thread = (response_id, self.context_manager.version) if response_id else None
+        cache_path = f"{filepath}.cache.npz"
+        if os.path.exists(cache_path):
+            self.response_cache.load(cache_path)
+    
+    def _cache_embedding(self, message: str):
+        """Normalized embedding of message, or None if it can't be computed.
+        
+        The cache is an optimization, so embedding errors just skip it.
+        """
+        try:
+            return embed_texts(self.client, [message])[0]
+        except Exception:
+            return None
+    
     def get_context_manager(self) -> ContextManager:
         """Get the context manager for direct CRUD operations."""
         return self.context_manager
 
+# Streamed reply chunks buffered per terminal write
+STREAM_FLUSH_CHUNKS = 4
+
+# "start:end" range argument; either side may be empty
+SLICE_RE = re.compile(r'^(-?\d*):(-?\d*)$')
+
+def _parse_slice(text: str) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """(start, end) for a "start:end" argument, or None if text isn't one."""
+    match = SLICE_RE.match(text)
+    if not match:
+        return None
+    start, end = match.groups()
+    return (int(start) if start else None, int(end) if end else None)
+
+def _short_preview(entry: Dict[str, Any]) -> str:
+    """First 100 characters of the entry's content, with "..." if cut."""
+    preview = ContextManager.preview_of(entry, 100)
+    return preview + "..." if len(entry['content']) > 100 else preview
+
+def _print_entries(entries):
+    """Print one preview line per entry, as a single write."""
+    lines = "\n".join(f"[{i}] {entry['role']}: {_short_preview(entry)}"
+                      for i, entry in enumerate(entries))
+    if lines:
+        print(lines)
+
+def _handle_chat(args: str, smithers: Smithers, cm: ContextManager):
+    if args:
+        print("Smithers: ", end="", flush=True)
+        # Write a few deltas at a time rather than one write per token
+        pending = []
+        for chunk in smithers.stream_chat(args):
+            pending.append(chunk)
+            if len(pending) >= STREAM_FLUSH_CHUNKS:
+                sys.stdout.write("".join(pending))
+                sys.stdout.flush()
+                pending.clear()
+        sys.stdout.write("".join(pending))
+        print("\n")
+    else:
+        print("Usage: chat <message>")
+
+def _handle_create(args: str, smithers: Smithers, cm: ContextManager):
+    role, _, content = args.partition(' ')
+    if content:
+        idx = cm.create(role, content)
+        print(f"Created entry at index {idx}\n")
+    else:
+        print("Usage: create <role> <content>")
+
+def _handle_read(args: str, smithers: Smithers, cm: ContextManager):
+    span = _parse_slice(args)
+    if not args:
+        _print_entries(cm.read())
+    elif span is not None:
+        _print_entries(cm.read(start=span[0], end=span[1]))
+    elif args.isdigit():
+        entry = cm.read(index=int(args))
+        if entry:
+            print(f"{entry['role']}: {entry['content']}")
+        else:
+            print("Entry not found")
+    else:
+        _print_entries(cm.read(role=args))
+    print()
+
+def _handle_update(args: str, smithers: Smithers, cm: ContextManager):
+    idx, _, rest = args.partition(' ')
+    field, _, value = rest.partition(' ')
+    if not value:
+        print("Usage: update <index> <field> <value>")
+        return
+    
+    success = False
+    if field == "role":
+        success = cm.update(int(idx), role=value)
+    elif field == "content":
+        success = cm.update(int(idx), content=value)
+    elif field == "metadata":
+        try:
+            metadata = json.loads(value)
+            success = cm.update(int(idx), metadata=metadata)
+        except ValueError:
+            print("Invalid JSON for metadata")
+    if success:
+        print(f"Updated entry {idx}\n")
+    else:
+        print("Update failed\n")
+
+def _handle_delete(args: str, smithers: Smithers, cm: ContextManager):
+    span = _parse_slice(args)
+    if not args:
+        print("Usage: delete <index|start:end|role>")
+    elif span is not None:
+        deleted = cm.delete(start=span[0], end=span[1])
+        print(f"Deleted {deleted} entries\n")
+    elif args.isdigit():
+        deleted = cm.delete(index=int(args))
+        print(f"Deleted {deleted} entry\n")
+    else:
+        deleted = cm.delete(role=args)
+        print(f"Deleted {deleted} entries\n")
+
+def _handle_search(args: str, smithers: Smithers, cm: ContextManager):
+    if args:
+        results = cm.search(args)
+        lines = [f"{entry['role']}: {_short_preview(entry)}" for entry in results]
+        lines.append(f"Found {len(results)} results\n")
+        print("\n".join(lines))
+    else:
+        print("Usage: search <query>")
+
+def _handle_compact(args: str, smithers: Smithers, cm: ContextManager):
+    span = _parse_slice(args)
+    if span is not None:
+        summary = smithers.compact_context(start=span[0], end=span[1])
+    else:
+        summary = smithers.compact_context()
+    print(f"Compacted summary:\n{summary}\n")
+
+def _handle_stats(args: str, smithers: Smithers, cm: ContextManager):
+    stats = cm.stats()
+    print(f"Context Statistics:")
+    print(f"  Total entries: {stats['total_entries']}")
+    print(f"  Total characters: {stats['total_characters']}")
+    print(f"  Average length: {stats['average_length']:.1f}")
+    print(f"  Roles: {stats['roles']}\n")
+
+def _handle_clear(args: str, smithers: Smithers, cm: ContextManager):
+    cm.clear()
+    print("Context cleared\n")
+
+def _handle_save(args: str, smithers: Smithers, cm: ContextManager):
+    if args:
+        smithers.save(args)
+        print(f"Saved to {args}\n")
+    else:
+        print("Usage: save <filepath>")
+
+def _handle_load(args: str, smithers: Smithers, cm: ContextManager):
+    if args:
+        smithers.load(args)
+        print(f"Loaded from {args}\n")
+    else:
+        print("Usage: load <filepath>")
+
+def _handle_rag(args: str, smithers: Smithers, cm: ContextManager):
+    if args:
+        response = smithers.rag_enhanced_chat(args)
+        print(f"Smithers (RAG): {response}\n")
+    else:
+        print("Usage: rag <query>")
+
+def _handle_visualize(args: str, smithers: Smithers, cm: ContextManager):
+    if not VISUALIZER_AVAILABLE:
+        print("Visualization not available. Install with: pip install networkx matplotlib\n")
+        return
+    
+    viz = ConversationVisualizer(cm)
+    output_file = None
+    start = None
+    end = None
+    
+    for part in args.split():
+        if part.endswith(('.png', '.jpg', '.pdf')):
+            output_file = part
+        else:
+            span = _parse_slice(part)
+            if span is not None:
+                start, end = span
+    
+    try:
+        viz.visualize(output_file=output_file, start=start, end=end)
+        if output_file:
+            print(f"Visualization saved to {output_file}\n")
+        else:
+            print("Visualization displayed\n")
+    except Exception as e:
+        print(f"Visualization error: {str(e)}\n")
+
+# REPL command -> handler(args, smithers, cm)
+HANDLERS = {
+    "chat": _handle_chat,
+    "create": _handle_create,
+    "read": _handle_read,
+    "update": _handle_update,
+    "delete": _handle_delete,
+    "search": _handle_search,
+    "compact": _handle_compact,
+    "stats": _handle_stats,
+    "clear": _handle_clear,
+    "save": _handle_save,
+    "load": _handle_load,
+    "rag": _handle_rag,
+    "visualize": _handle_visualize,
+    "viz": _handle_visualize,
+}
+
+EXIT_COMMANDS = frozenset(('exit', 'quit', 'q'))
+
+def _input_lines() -> Iterator[str]:
+    """REPL input lines until EOF.
+    
+    Interactive sessions get a prompt via input(); piped or redirected
+    scripts are read straight from sys.stdin, without a prompt per line.
+    """
+    if not sys.stdin.isatty():
+        yield from sys.stdin
+        return
+    while True:
+        try:
+            yield input("> ")
+        except EOFError:
+            return
+
 def main():
+    try:
+        get_client()
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
     smithers = Smithers()
     cm = smithers.get_context_manager()
     
@@ -111,175 +597,24 @@ def main():
     print("  exit/quit - Exit")
     print()
     
+    lines = _input_lines()
     while True:
         try:
-            user_input = input("> ").strip()
+            user_input = next(lines, None)
+            if user_input is None:
+                break
+            user_input = user_input.strip()
             if not user_input:
                 continue
             
-            if user_input.lower() in ['exit', 'quit', 'q']:
+            command, _, args = user_input.partition(' ')
+            command = command.lower()
+            if command in EXIT_COMMANDS and not args:
                 break
             
-            parts = user_input.split(' ', 1)
-            command = parts[0].lower()
-            args = parts[1] if len(parts) > 1 else ""
-            
-            if command == "chat":
-                if args:
-                    response = smithers.chat(args)
-                    print(f"Smithers: {response}\n")
-                else:
-                    print("Usage: chat <message>")
-            
-            elif command == "create":
-                create_parts = args.split(' ', 1)
-                if len(create_parts) == 2:
-                    role, content = create_parts
-                    idx = cm.create(role, content)
-                    print(f"Created entry at index {idx}\n")
-                else:
-                    print("Usage: create <role> <content>")
-            
-            elif command == "read":
-                if not args:
-                    entries = cm.read()
-                    for i, entry in enumerate(entries):
-                        print(f"[{i}] {entry['role']}: {entry['content'][:100]}...")
-                elif ':' in args:
-                    start, end = args.split(':')
-                    entries = cm.read(start=int(start), end=int(end))
-                    for i, entry in enumerate(entries):
-                        print(f"[{i}] {entry['role']}: {entry['content'][:100]}...")
-                elif args.isdigit():
-                    entry = cm.read(index=int(args))
-                    if entry:
-                        print(f"{entry['role']}: {entry['content']}")
-                    else:
-                        print("Entry not found")
-                else:
-                    entries = cm.read(role=args)
-                    for i, entry in enumerate(entries):
-                        print(f"[{i}] {entry['role']}: {entry['content'][:100]}...")
-                print()
-            
-            elif command == "update":
-                update_parts = args.split(' ', 2)
-                if len(update_parts) >= 3:
-                    idx, field, value = update_parts
-                    success = False
-                    if field == "role":
-                        success = cm.update(int(idx), role=value)
-                    elif field == "content":
-                        success = cm.update(int(idx), content=value)
-                    elif field == "metadata":
-                        import json
-                        try:
-                            metadata = json.loads(value)
-                            success = cm.update(int(idx), metadata=metadata)
-                        except:
-                            print("Invalid JSON for metadata")
-                    if success:
-                        print(f"Updated entry {idx}\n")
-                    else:
-                        print("Update failed\n")
-                else:
-                    print("Usage: update <index> <field> <value>")
-            
-            elif command == "delete":
-                if not args:
-                    print("Usage: delete <index|start:end|role>")
-                elif ':' in args:
-                    start, end = args.split(':')
-                    deleted = cm.delete(start=int(start), end=int(end))
-                    print(f"Deleted {deleted} entries\n")
-                elif args.isdigit():
-                    deleted = cm.delete(index=int(args))
-                    print(f"Deleted {deleted} entry\n")
-                else:
-                    deleted = cm.delete(role=args)
-                    print(f"Deleted {deleted} entries\n")
-            
-            elif command == "search":
-                if args:
-                    results = cm.search(args)
-                    for entry in results:
-                        print(f"{entry['role']}: {entry['content'][:100]}...")
-                    print(f"Found {len(results)} results\n")
-                else:
-                    print("Usage: search <query>")
-            
-            elif command == "compact":
-                if ':' in args:
-                    start, end = args.split(':')
-                    summary = smithers.compact_context(start=int(start), end=int(end))
-                else:
-                    summary = smithers.compact_context()
-                print(f"Compacted summary:\n{summary}\n")
-            
-            elif command == "stats":
-                stats = cm.stats()
-                print(f"Context Statistics:")
-                print(f"  Total entries: {stats['total_entries']}")
-                print(f"  Total characters: {stats['total_characters']}")
-                print(f"  Average length: {stats['average_length']:.1f}")
-                print(f"  Roles: {stats['roles']}\n")
-            
-            elif command == "clear":
-                cm.clear()
-                print("Context cleared\n")
-            
-            elif command == "save":
-                if args:
-                    cm.save(args)
-                    print(f"Saved to {args}\n")
-                else:
-                    print("Usage: save <filepath>")
-            
-            elif command == "load":
-                if args:
-                    cm.load(args)
-                    print(f"Loaded from {args}\n")
-                else:
-                    print("Usage: load <filepath>")
-            
-            elif command == "rag":
-                if args:
-                    response = smithers.rag_enhanced_chat(args)
-                    print(f"Smithers (RAG): {response}\n")
-                else:
-                    print("Usage: rag <query>")
-            
-            elif command == "visualize" or command == "viz":
-                if not VISUALIZER_AVAILABLE:
-                    print("Visualization not available. Install with: pip install networkx matplotlib\n")
-                else:
-                    viz = ConversationVisualizer(cm)
-                    output_file = None
-                    start = None
-                    end = None
-                    
-                    if args:
-                        parts = args.split()
-                        for part in parts:
-                            if part.endswith('.png') or part.endswith('.jpg') or part.endswith('.pdf'):
-                                output_file = part
-                            elif ':' in part:
-                                start_str, end_str = part.split(':')
-                                try:
-                                    start = int(start_str) if start_str else None
-                                    end = int(end_str) if end_str else None
-                                except:
-                                    pass
-                    
-                    try:
-                        viz.visualize(output_file=output_file, start=start, end=end)
-                        if output_file:
-                            print(f"Visualization saved to {output_file}\n")
-                        else:
-                            print("Visualization displayed\n")
-                    except Exception as e:
-                        print(f"Visualization error: {str(e)}\n")
-            
+            handler = HANDLERS.get(command)
+            if handler:
+                handler(args, smithers, cm)
             else:
                 print(f"Unknown command: {command}\n")
         
@@ -291,4 +626,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
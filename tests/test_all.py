@@ -3,6 +3,45 @@
 
 import sys
 import os
+import re
+import types
+import zlib
+
+class FakeClient:
+    """Stand-in for the OpenAI client: numbered replies, bag-of-words embeddings."""
+    
+    def __init__(self):
+        self.requests = []
+        self.embedded = []
+        # Events for the next stream=True request; None streams the reply
+        self.stream_events = None
+        self.responses = types.SimpleNamespace(create=self._respond)
+        self.embeddings = types.SimpleNamespace(create=self._embed)
+    
+    def _respond(self, **kwargs):
+        self.requests.append(kwargs)
+        n = len(self.requests)
+        if kwargs.get("stream"):
+            events, self.stream_events = self.stream_events, None
+            if events is None:
+                events = [types.SimpleNamespace(type="response.output_text.delta", delta=delta)
+                          for delta in ("reply ", str(n))]
+                events.append(types.SimpleNamespace(type="response.completed",
+                                                    response=types.SimpleNamespace(id=f"resp_{n}")))
+            return iter(events)
+        return types.SimpleNamespace(id=f"resp_{n}", output_text=f"reply {n}")
+    
+    def _embed(self, model, input):
+        self.embedded.append(input)
+        return types.SimpleNamespace(data=[types.SimpleNamespace(embedding=self.vector(text)) for text in input])
+    
+    @staticmethod
+    def vector(text):
+        # Texts sharing words get similar embeddings
+        vector = [0.0] * 1024
+        for word in re.findall(r"\w+", text.lower()):
+            vector[zlib.crc32(word.encode()) % 1024] += 1.0
+        return vector
 
 def test_imports():
     """Test all imports work."""
@@ -36,6 +75,9 @@ def test_context_manager():
         assert entry["role"] == "user", "Read should return user"
         all_entries = cm.read()
         assert len(all_entries) == 2, "Should have 2 entries"
+        assert cm.message_of(entry) == {"role": "user", "content": "Hello"}, "Message should match the entry"
+        assert cm.tokens_of(entry) == cm.count_tokens("Hello"), "Token count should match the content"
+        assert cm.preview_of(entry, 3) == "Hel", "Preview should be cut to length"
         print("  ✓ Read operations")
         
         # Update
@@ -53,6 +95,13 @@ def test_context_manager():
         # Search
         results = cm.search("Hello")
         assert len(results) > 0, "Should find results"
+        cm.create("user", "Python snakes and more python")
+        cm.create("user", "A python project")
+        results = cm.search("python snakes")
+        assert [e["content"] for e in results] == ["Python snakes and more python", "A python project"], "Best match should rank first"
+        cm.delete(index=1)
+        assert len(cm.search("snakes")) == 0, "Deleted entries should leave the index"
+        cm.delete(index=1)
         print("  ✓ Search operations")
         
         # Stats
@@ -73,6 +122,129 @@ def test_context_manager():
         print(f"  ✗ Context Manager test failed: {e}")
         return False
 
+def test_context_manager_stats():
+    """Test running stats stay in sync with the entries."""
+    print("\nTesting Context Manager stats...")
+    try:
+        from context_manager import ContextManager
+        cm = ContextManager()
+        
+        cm.create("user", "Hello")
+        cm.create("assistant", "Hi there")
+        cm.create("user", "How are you?")
+        cm.update(1, role="system", content="Be brief")
+        cm.delete(role="user")
+        stats = cm.stats()
+        assert stats["total_entries"] == 1, "Should have 1 entry"
+        assert stats["total_characters"] == len("Be brief"), "Characters should match content"
+        assert stats["roles"] == {"system": 1}, "Roles should only count remaining entries"
+        assert cm.token_count == len("Be brief") // 4, "Token count should match content"
+        print("  ✓ Running totals follow create/update/delete")
+        
+        version = cm.version
+        assert cm.insert(0, "system", "Summary") == 0, "Insert should return the index"
+        assert cm.read(0)["content"] == "Summary", "Inserted entry should be first"
+        assert cm.stats()["roles"] == {"system": 2}, "Insert should be counted"
+        assert cm.version != version, "Changes should bump the version"
+        print("  ✓ Insert and version tracking")
+        
+        cm.create("user", "one two")
+        cm.create("assistant", "three")
+        assert cm.delete(start=0, end=2) == 2, "Range delete should remove 2 entries"
+        cm.save("test_stats.json")
+        cm2 = ContextManager()
+        cm2.create("user", "stale")
+        cm2.load("test_stats.json")
+        os.remove("test_stats.json")
+        assert cm2.stats() == cm.stats(), "Loaded stats should match the saved context"
+        assert cm2.token_count == cm.token_count, "Loaded token count should match"
+        print("  ✓ Running totals follow range delete and load")
+        
+        cm.clear()
+        assert cm.stats()["roles"] == {}, "Roles should be empty after clear"
+        assert cm.stats()["average_length"] == 0, "Average should be 0 when empty"
+        print("  ✓ Running totals reset on clear")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Context Manager stats test failed: {e}")
+        return False
+
+def test_semantic_cache():
+    """Test semantic cache lookup, eviction and persistence."""
+    print("\nTesting Semantic Cache...")
+    try:
+        import numpy as np
+        from semantic_cache import SemanticCache
+        
+        cache = SemanticCache(threshold=0.9, max_entries=2)
+        a = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+        b = np.array([0.0, 1.0, 0.0], dtype=np.float32)
+        c = np.array([0.0, 0.0, 1.0], dtype=np.float32)
+        
+        assert cache.lookup(a) is None, "Empty cache should miss"
+        cache.add(a, "what is ML?", "Machine learning.")
+        near_a = np.array([0.99, 0.14, 0.0], dtype=np.float32)
+        assert cache.lookup(near_a / np.linalg.norm(near_a)) == "Machine learning.", "Similar prompt should hit"
+        assert cache.lookup(b) is None, "Dissimilar prompt should miss"
+        print("  ✓ Similarity lookup")
+        
+        cache.add(b, "b", "B")
+        cache.lookup(a)
+        cache.add(c, "c", "C")
+        assert len(cache) == 2, "Cache should be capped at max_entries"
+        assert cache.lookup(b) is None, "Least recently used entry should be evicted"
+        assert cache.lookup(a) == "Machine learning.", "Recently used entry should be kept"
+        print("  ✓ LRU eviction")
+        
+        cache.save("test_cache.npz")
+        loaded = SemanticCache(threshold=0.9)
+        loaded.load("test_cache.npz")
+        os.remove("test_cache.npz")
+        assert loaded.lookup(c) == "C", "Loaded cache should keep entries"
+        print("  ✓ Save/Load operations")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Semantic cache test failed: {e}")
+        return False
+
+def test_filler_corpus():
+    """Test filler windows, spliced inserts, regrowth and seeding."""
+    print("\nTesting Filler Corpus...")
+    try:
+        import numpy as np
+        from benchmarks.base_benchmark import FillerCorpus
+        sentences = ("Alpha one.", "Beta two.", "Gamma three.")
+        split = lambda text: text.split(". ")
+        
+        corpus = FillerCorpus(sentences, rng=np.random.default_rng(0), size=50)
+        filler = split(corpus.weave(10))
+        assert len(filler) == 10, "Should produce count sentences"
+        assert all(s.rstrip(".") + "." in sentences for s in filler), "Sentences should come from the pool"
+        print("  ✓ Sentence-aligned windows")
+        
+        woven = split(corpus.weave(10, [(0, "First."), (5, "Middle."), (10, "Last.")]))
+        assert len(woven) == 13, "Inserts should add to the filler"
+        assert woven[0] == "First", "Position 0 should come before all filler"
+        assert woven[6] == "Middle", "Middle insert should follow 5 filler sentences"
+        assert woven[-1] == "Last.", "Position count should come after all filler"
+        print("  ✓ Inserts at start, middle and end")
+        
+        small = FillerCorpus(sentences, rng=np.random.default_rng(0), size=8)
+        assert len(split(small.weave(20))) == 20, "Longer runs should regrow the corpus"
+        print("  ✓ Regrows for long runs")
+        
+        a = FillerCorpus(sentences, rng=np.random.default_rng(7), size=20, refresh_every=2)
+        b = FillerCorpus(sentences, rng=np.random.default_rng(7), size=20, refresh_every=2)
+        assert [a.weave(5, [(2, "X.")]) for _ in range(4)] == [b.weave(5, [(2, "X.")]) for _ in range(4)], "Same seed should give the same text"
+        print("  ✓ Seeded runs are reproducible")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Filler corpus test failed: {e}")
+        return False
+
 def test_visualizer():
     """Test visualizer (even without libraries)."""
     print("\nTesting Visualizer...")
@@ -98,6 +270,67 @@ def test_visualizer():
         print(f"  ✗ Visualizer test failed: {e}")
         return False
 
+def test_visualizer_incremental():
+    """Test incremental graph builds match a fresh build."""
+    print("\nTesting Visualizer incremental builds...")
+    try:
+        from visualizer import ConversationVisualizer, VISUALIZATION_AVAILABLE
+        from context_manager import ContextManager
+        if not VISUALIZATION_AVAILABLE:
+            print("  - Skipped: visualization libraries not installed")
+            return True
+        
+        def matches_fresh(viz):
+            fresh = ConversationVisualizer(viz.context_manager)
+            fresh.build_graph()
+            return (dict(viz.G.nodes(data=True)) == dict(fresh.G.nodes(data=True))
+                    and set(viz.G.edges()) == set(fresh.G.edges()))
+        
+        cm = ContextManager()
+        for i in range(3):
+            cm.create("user", f"message {i}")
+        viz = ConversationVisualizer(cm)
+        viz.build_graph()
+        cm.create("assistant", "appended one")
+        cm.create("user", "appended two")
+        assert viz._only_appended(), "Appends should be detected"
+        viz.build_graph()
+        assert matches_fresh(viz), "Appended graph should match a fresh build"
+        print("  ✓ Appends extend the graph")
+        
+        cm.update(1, content="edited")
+        assert not viz._only_appended(), "Edits should force a rebuild"
+        viz.build_graph()
+        assert matches_fresh(viz), "Rebuilt graph should show the edit"
+        cm.insert(cm.size() - 1, "system", "inserted before last")
+        assert not viz._only_appended(), "Inserting before the last entry should force a rebuild"
+        viz.build_graph()
+        assert matches_fresh(viz), "Rebuilt graph should include the insert"
+        cm.delete(index=0)
+        cm.create("user", "replacement")
+        assert not viz._only_appended(), "Delete plus append should force a rebuild"
+        viz.build_graph()
+        assert matches_fresh(viz), "Rebuilt graph should drop the deleted entry"
+        print("  ✓ Edits, inserts and deletes rebuild the graph")
+        
+        viz.build_graph(0, 2)
+        assert viz.G.number_of_nodes() == 2, "Range build should only include the range"
+        viz.build_graph()
+        assert matches_fresh(viz), "Full build after a range build should include everything"
+        other = ContextManager()
+        for entry in cm.read():
+            other.create(entry["role"], entry["content"])
+        other.update(0, content="different")
+        viz.context_manager = other
+        viz.build_graph()
+        assert matches_fresh(viz), "Swapping the context manager should rebuild"
+        print("  ✓ Range builds and context manager swaps rebuild the graph")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Visualizer incremental test failed: {e}")
+        return False
+
 def test_smithers():
     """Test Smithers initialization."""
     print("\nTesting Smithers...")
@@ -118,6 +351,180 @@ def test_smithers():
         print(f"  ✗ Smithers test failed: {e}")
         return False
 
+def test_smithers_cache():
+    """Test the response cache only answers context-free requests."""
+    print("\nTesting Smithers response cache...")
+    try:
+        from smithers import Smithers
+        smithers = Smithers()
+        client = smithers.client = FakeClient()
+        
+        first = smithers.chat("What is Python?", use_context=False)
+        assert smithers.chat("What is Python?", use_context=False) == first, "Repeat should hit the cache"
+        assert len(client.requests) == 1, "Cache hit should skip the completion call"
+        print("  ✓ Context-free repeats hit the cache")
+        
+        smithers.chat("Tell me about Rust")
+        smithers.chat("tell me more")
+        smithers.context_manager.clear()
+        smithers.chat("Tell me about Go")
+        smithers.chat("tell me more")
+        assert len(client.requests) == 5, "Follow-ups with context should always call the model"
+        print("  ✓ Requests with context skip the cache")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Smithers cache test failed: {e}")
+        return False
+
+def test_smithers_context():
+    """Test response threading, context windowing, summaries and resuming."""
+    print("\nTesting Smithers context handling...")
+    try:
+        from smithers import Smithers, SUMMARY_PREFIX
+        smithers = Smithers()
+        client = smithers.client = FakeClient()
+        cm = smithers.context_manager
+        
+        smithers.chat("Hello", use_cache=False)
+        smithers.chat("How are you?", use_cache=False)
+        assert client.requests[1].get("previous_response_id") == "resp_1", "Unchanged context should chain on the last reply"
+        assert client.requests[1]["input"] == "How are you?", "Chained requests should only send the new message"
+        cm.update(0, content="Hi")
+        assert smithers._thread_response_id() is None, "Editing the context should drop the thread"
+        smithers.chat("Still there?", use_cache=False)
+        assert "previous_response_id" not in client.requests[2], "Edited context should be resent in full"
+        assert client.requests[2]["input"][0]["content"] == "Hi", "Resent context should include the edit"
+        print("  ✓ Response threading follows context changes")
+        
+        cm.clear()
+        cm.create("system", SUMMARY_PREFIX + "earlier", {"summary": True})
+        for i in range(10):
+            cm.create("user", f"{i} " + "x" * 400)
+        # Summary, the last 3 entries and the message exactly fill the budget
+        exact = sum(cm.count_tokens(e["content"]) for e in (cm.read(0), *cm.read(start=-3))) + cm.count_tokens("next")
+        smithers.context_budget = smithers.reply_reserve + exact
+        messages = smithers._windowed_messages("next")
+        assert messages[0]["content"] == SUMMARY_PREFIX + "earlier", "Summary should be kept when older entries are trimmed"
+        assert [m["content"][0] for m in messages[1:-1]] == ["7", "8", "9"], "Newest entries that fit should be kept"
+        assert messages[-1] == {"role": "user", "content": "next"}, "Message should come last"
+        smithers.context_budget -= 1
+        messages = smithers._windowed_messages("next")
+        assert [m["content"][0] for m in messages[1:-1]] == ["8", "9"], "Summary tokens should count against the budget"
+        assert sum(cm.count_tokens(m["content"]) for m in messages) <= smithers.context_budget - smithers.reply_reserve, "Request should fit the budget"
+        smithers.context_budget = smithers.reply_reserve + 10 ** 6
+        assert len(smithers._windowed_messages("next")) == 12, "Summary shouldn't be sent twice when everything fits"
+        print("  ✓ Windowed messages fit the token budget")
+        
+        long_summary = "s" * 500
+        cm.update(0, content=SUMMARY_PREFIX + long_summary)
+        smithers.summary_threshold = 100
+        smithers.summary_min_tokens = 50
+        smithers.keep_recent = 4
+        requests = len(client.requests)
+        smithers._summarize_if_needed()
+        assert len(client.requests) == requests + 1, "Summarizing should cost one completion"
+        assert long_summary in client.requests[-1]["input"], "Previous summary should be passed in full"
+        assert cm.size() == 5 and cm.read(0)["metadata"].get("summary"), "Older entries should become one summary"
+        smithers._summarize_if_needed()
+        assert len(client.requests) == requests + 1, "Nothing new to fold should skip summarizing"
+        print("  ✓ Summaries fold only new turns")
+        
+        responses = client.responses
+        def fail(**kwargs):
+            raise RuntimeError("rate limited")
+        client.responses = types.SimpleNamespace(create=fail)
+        cm.create("user", "y" * 400)
+        cm.create("user", "z" * 400)
+        size = cm.size()
+        try:
+            smithers.compact_context()
+            raise AssertionError("Failed compaction should raise")
+        except RuntimeError as e:
+            assert str(e) == "rate limited", "Compaction should raise the API error"
+        smithers._summarize_if_needed()
+        assert cm.size() == size, "Failed compaction should keep the context"
+        reply = types.SimpleNamespace(id="resp_error", output_text="Error: codes are listed below")
+        client.responses = types.SimpleNamespace(create=lambda **kwargs: reply)
+        smithers._summarize_if_needed()
+        assert cm.read(0)["content"] == SUMMARY_PREFIX + reply.output_text, "Summaries starting with 'Error:' should be kept"
+        client.responses = responses
+        print("  ✓ Failed compactions raise and keep the context")
+        
+        smithers.context_budget = 128_000
+        smithers.chat("Remember this", use_cache=False)
+        smithers.save("test_smithers.json")
+        resumed = Smithers()
+        resumed.load("test_smithers.json")
+        os.remove("test_smithers.json")
+        os.remove("test_smithers.json.cache.npz")
+        assert resumed._thread_response_id() == f"resp_{len(client.requests)}", "Load should resume the thread"
+        print("  ✓ Loading resumes the thread")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Smithers context test failed: {e}")
+        return False
+
+def test_smithers_stream():
+    """Test streamed replies are recorded and stream failures reported."""
+    print("\nTesting Smithers streaming...")
+    try:
+        from smithers import Smithers
+        smithers = Smithers()
+        client = smithers.client = FakeClient()
+        
+        assert "".join(smithers.stream_chat("Hello", use_cache=False)) == "reply 1", "Chunks should make up the reply"
+        last = smithers.context_manager.read(index=1)
+        assert last["content"] == "reply 1" and last["metadata"]["response_id"] == "resp_1", "Streamed reply should be recorded"
+        print("  ✓ Streamed replies are recorded")
+        
+        failed = types.SimpleNamespace(error=types.SimpleNamespace(message="server overloaded"))
+        client.stream_events = [types.SimpleNamespace(type="response.output_text.delta", delta="par"),
+                                types.SimpleNamespace(type="response.failed", response=failed)]
+        chunks = list(smithers.stream_chat("Again", use_cache=False))
+        assert chunks[-1] == "Error: server overloaded", "Failed responses should report their reason"
+        client.stream_events = [types.SimpleNamespace(type="error", message="bad request")]
+        assert list(smithers.stream_chat("Again", use_cache=False))[-1] == "Error: bad request", "Error events should report their message"
+        assert smithers.context_manager.size() == 2, "Failed streams shouldn't be recorded"
+        print("  ✓ Stream failures report the server's reason")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Smithers streaming test failed: {e}")
+        return False
+
+def test_smithers_rag():
+    """Test RAG retrieval cutoff and embedding input limits."""
+    print("\nTesting Smithers RAG...")
+    try:
+        from smithers import Smithers
+        from embeddings import MAX_INPUT_CHARS
+        smithers = Smithers()
+        client = smithers.client = FakeClient()
+        cm = smithers.context_manager
+        
+        cm.create("user", "Python snakes are long")
+        cm.create("user", "Weather report for today")
+        cm.create("user", "word " * 5000)
+        results = smithers.rag_search("python snakes", limit=2)
+        assert [e["content"] for e in results] == ["Python snakes are long"], "Only similar entries should be retrieved"
+        assert smithers.rag_search("quantum chromodynamics") == [], "Unrelated queries should retrieve nothing"
+        assert max(len(text) for batch in client.embedded for text in batch) <= MAX_INPUT_CHARS, "Inputs should be truncated"
+        print("  ✓ Similarity cutoff and input truncation")
+        
+        smithers.rag_enhanced_chat("python snakes")
+        expected = "Relevant context:\n[user]: Python snakes are long\n\nUser question: python snakes"
+        assert client.requests[-1]["input"][-1]["content"] == expected, "Retrieved entries should be listed ahead of the question"
+        smithers.rag_enhanced_chat("quantum chromodynamics")
+        assert client.requests[-1]["input"] == "quantum chromodynamics", "No matches should send the plain message"
+        print("  ✓ RAG chat without matches")
+        
+        return True
+    except Exception as e:
+        print(f"  ✗ Smithers RAG test failed: {e}")
+        return False
+
 def main():
     """Run all tests."""
     print("=" * 50)
@@ -127,8 +534,16 @@ def main():
     results = []
     results.append(("Imports", test_imports()))
     results.append(("Context Manager", test_context_manager()))
+    results.append(("Context Stats", test_context_manager_stats()))
+    results.append(("Semantic Cache", test_semantic_cache()))
+    results.append(("Filler Corpus", test_filler_corpus()))
     results.append(("Visualizer", test_visualizer()))
+    results.append(("Visualizer Builds", test_visualizer_incremental()))
     results.append(("Smithers", test_smithers()))
+    results.append(("Smithers Cache", test_smithers_cache()))
+    results.append(("Smithers Context", test_smithers_context()))
+    results.append(("Smithers Streaming", test_smithers_stream()))
+    results.append(("Smithers RAG", test_smithers_rag()))
     
     print("\n" + "=" * 50)
     print("Test Results Summary")
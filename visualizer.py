@@ -1,24 +1,44 @@
 #!/usr/bin/env python3
-try:
-    import matplotlib.pyplot as plt
-    import matplotlib.patches as mpatches
-    import networkx as nx
-    VISUALIZATION_AVAILABLE = True
-except ImportError as e:
-    VISUALIZATION_AVAILABLE = False
-    print(f"Warning: Visualization libraries not available. Install with: pip install networkx matplotlib")
-    print(f"Error: {e}")
-
+import importlib.util
 from typing import List, Dict, Optional
+import numpy as np
 from context_manager import ContextManager
 
+# matplotlib and networkx are slow to import, so only check that they are
+# installed here; _import_libs() loads them on first use
+VISUALIZATION_AVAILABLE = all(importlib.util.find_spec(name) is not None
+                              for name in ("matplotlib", "networkx"))
+if not VISUALIZATION_AVAILABLE:
+    print(f"Warning: Visualization libraries not available. Install with: pip install networkx matplotlib")
+
+plt = None
+mpatches = None
+nx = None
+
+def _import_libs():
+    global plt, mpatches, nx
+    if nx is None:
+        import matplotlib.pyplot as plt
+        import matplotlib.patches as mpatches
+        import networkx as nx
+
+# Node colors by role; anything else uses the last ("Other") color
+ROLE_INDEX = {"user": 0, "assistant": 1, "system": 2}
+PALETTE = np.array(["#4A90E2", "#50C878", "#FF6B6B", "#95A5A6"])
+# Node label initials, matching the legend ("O" for Other)
+ROLE_INITIAL = {"user": "U", "assistant": "A", "system": "S"}
+
 class ConversationVisualizer:
     def __init__(self, context_manager: Optional[ContextManager] = None):
         self.context_manager = context_manager or ContextManager()
-        if VISUALIZATION_AVAILABLE:
-            self.G = nx.DiGraph()
-        else:
-            self.G = None
+        # Created with the first build, once networkx is imported
+        self.G = None
+        # (context manager, size, version, last entry) after the last full
+        # build, used to extend the graph when entries were only appended
+        self._built = None
+        self._graph_range = (None, None)
+        self._layout_key = None
+        self._layout: Dict = {}
     
     def count_words(self, text: str) -> int:
         """Count words in text."""
@@ -31,30 +51,60 @@ class ConversationVisualizer:
         return max(min_size, min(max_size, word_count * 10))
     
     def build_graph(self, start: Optional[int] = None, end: Optional[int] = None):
-        """Build graph from context entries."""
-        if not VISUALIZATION_AVAILABLE:
-            return
-        self.G.clear()
+        """Build graph from context entries.
         
-        entries = self.context_manager.read(start=start, end=end)
-        if not entries:
+        Without a range, entries appended since the last full build are added
+        to the existing graph; anything else rebuilds it.
+        """
+        if not VISUALIZATION_AVAILABLE:
             return
+        if self.G is None:
+            _import_libs()
+            self.G = nx.DiGraph()
+        cm = self.context_manager
+        full = start is None and end is None
+        first = self._built[1] if full and self._only_appended() else 0
+        if first == 0:
+            self.G.clear()
+            entries = cm.iter_range(start, end)
+        else:
+            entries = cm.iter_range(first)
+        
+        # Previews are cached by ContextManager; word counts are only needed
+        # here, so they're counted for just the nodes being added
+        nodes = [
+            (f"node_{i}", {
+                "role": entry.get("role", "unknown"),
+                "content": cm.preview_of(entry, 100),
+                "word_count": len(entry["content"].split()),
+                "index": i,
+            })
+            for i, entry in enumerate(entries, first)
+        ]
+        self.G.add_nodes_from(nodes)
+        self.G.add_edges_from((f"node_{i - 1}", f"node_{i}") for i in range(max(1, first), first + len(nodes)))
         
-        for i, entry in enumerate(entries):
-            node_id = f"node_{i}"
-            role = entry.get("role", "unknown")
-            content = entry.get("content", "")
-            word_count = self.count_words(content)
-            
-            self.G.add_node(node_id, 
-                          role=role,
-                          content=content[:100] + "..." if len(content) > 100 else content,
-                          word_count=word_count,
-                          index=i)
-            
-            if i > 0:
-                prev_node = f"node_{i-1}"
-                self.G.add_edge(prev_node, node_id)
+        size = cm.size()
+        self._built = (cm, size, cm.version, cm.read(index=size - 1)) if full else None
+        self._graph_range = (start, end)
+    
+    def _only_appended(self) -> bool:
+        """Whether the context only had entries appended since the last full build.
+        
+        Every change bumps ContextManager.version, and only create/insert bump
+        it by exactly one per added entry, so version and size growing in step
+        means nothing was edited or removed. The previously last entry being
+        in place rules out inserts before it.
+        """
+        if self._built is None:
+            return False
+        cm, size, version, last = self._built
+        if cm is not self.context_manager:
+            return False
+        grown = cm.size() - size
+        if grown < 0 or cm.version - version != grown:
+            return False
+        return size == 0 or cm.read(index=size - 1) is last
     
     def visualize(self, output_file: Optional[str] = None, 
                   start: Optional[int] = None, end: Optional[int] = None,
@@ -75,29 +125,23 @@ class ConversationVisualizer:
         
         pos = self._hierarchical_layout()
         
-        node_colors = []
-        node_sizes = []
-        node_labels = {}
+        # Colors and sizes for all nodes at once
+        node_data = [self.G.nodes[node_id] for node_id in self.G.nodes()]
+        roles = [data.get("role", "unknown") for data in node_data]
+        word_counts = np.fromiter((data.get("word_count", 0) for data in node_data),
+                                  dtype=np.int64, count=len(node_data))
+        color_index = np.fromiter((ROLE_INDEX.get(role, len(PALETTE) - 1) for role in roles),
+                                  dtype=np.intp, count=len(roles))
+        node_colors = PALETTE[color_index].tolist()
+        # Same as normalize_size() per node
+        node_sizes = np.clip(word_counts * 10, 100, 3000).tolist()
         
-        for node_id in self.G.nodes():
-            node_data = self.G.nodes[node_id]
-            role = node_data.get("role", "unknown")
-            word_count = node_data.get("word_count", 0)
-            
-            if role == "user":
-                node_colors.append("#4A90E2")
-            elif role == "assistant":
-                node_colors.append("#50C878")
-            elif role == "system":
-                node_colors.append("#FF6B6B")
-            else:
-                node_colors.append("#95A5A6")
-            
-            node_sizes.append(self.normalize_size(word_count))
-            
-            if show_labels:
-                label = f"{role[0].upper()}\n{word_count}w"
-                node_labels[node_id] = label
+        node_labels = {}
+        if show_labels:
+            node_labels = {
+                node_id: ROLE_INITIAL.get(role, "O") + "\n" + str(word_count) + "w"
+                for node_id, role, word_count in zip(self.G.nodes(), roles, word_counts.tolist())
+            }
         
         nx.draw_networkx_nodes(self.G, pos, 
                              node_color=node_colors,
@@ -121,10 +165,8 @@ class ConversationVisualizer:
                                   ax=ax)
         
         legend_elements = [
-            mpatches.Patch(color="#4A90E2", label="User"),
-            mpatches.Patch(color="#50C878", label="Assistant"),
-            mpatches.Patch(color="#FF6B6B", label="System"),
-            mpatches.Patch(color="#95A5A6", label="Other")
+            mpatches.Patch(color=color, label=label)
+            for color, label in zip(PALETTE.tolist(), ("User", "Assistant", "System", "Other"))
         ]
         ax.legend(handles=legend_elements, loc="upper right")
         
@@ -146,21 +188,23 @@ class ConversationVisualizer:
         """Create top-down hierarchical layout."""
         if not VISUALIZATION_AVAILABLE or self.G is None:
             return {}
-        pos = {}
-        
+        # Positions only depend on node order, so reuse them until the graph
+        # size or range changes
+        key = (len(self.G), self._graph_range)
+        if key == self._layout_key:
+            return self._layout
+        # build_graph adds nodes in index order, so no sort is needed
         nodes = list(self.G.nodes())
         if not nodes:
-            return pos
-        
-        nodes_sorted = sorted(nodes, key=lambda n: self.G.nodes[n].get("index", 0))
+            return {}
         
         y_spacing = 2.0
         x_center = 0
         
-        for i, node_id in enumerate(nodes_sorted):
-            y_pos = -i * y_spacing
-            pos[node_id] = (x_center, y_pos)
+        ys = (-y_spacing * np.arange(len(nodes))).tolist()
+        pos = dict(zip(nodes, ((x_center, y) for y in ys)))
         
+        self._layout_key, self._layout = key, pos
         return pos
     
     def visualize_from_file(self, filepath: str, output_file: Optional[str] = None):